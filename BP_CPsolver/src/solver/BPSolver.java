@@ -35,6 +35,9 @@
 */
 
 package solver;
+import java.nio.ByteBuffer;
+import java.nio.IntBuffer;
+
 import choco.Choco;
 import choco.Options;
 import choco.cp.model.CPModel;
@@ -97,4 +100,42 @@ public class BPSolver {
 
         return solver.isFeasible();
     }
+
+    /**
+     * Solves several instances sharing the same bins.
+     * Instance i is made of items[offsets[i]] .. items[offsets[i+1]-1].
+     * Returns a bitmap: bit (i % 8) of byte (i / 8) is set iff
+     * instance i is feasible.
+     */
+    public static byte[] isFeasibleBatch(int[] items, int[] offsets,
+            int numBins, int capacity) {
+        int count = offsets.length - 1;
+        byte[] bitmap = new byte[(count + 7) / 8];
+        BPSolver bps = new BPSolver(null, numBins, capacity);
+        for (int i = 0; i < count; i++) {
+            int[] inst = new int[offsets[i+1] - offsets[i]];
+            System.arraycopy(items, offsets[i], inst, 0, inst.length);
+            bps.setItems(inst);
+            if (bps.isFeasible())
+                bitmap[i / 8] |= 1 << (i % 8);
+        }
+        return bitmap;
+    }
+
+    /**
+     * Same as isFeasibleBatch(int[], int[], int, int), the instances being
+     * packed in a single buffer of big-endian 32 bits integers:
+     * count, offsets[0..count], items.
+     * Byte arrays are transferred at once by Py4J.
+     */
+    public static byte[] isFeasibleBatch(byte[] buffer, int numBins,
+            int capacity) {
+        IntBuffer ints = ByteBuffer.wrap(buffer).asIntBuffer();
+        int count = ints.get();
+        int[] offsets = new int[count + 1];
+        ints.get(offsets);
+        int[] items = new int[offsets[count]];
+        ints.get(items);
+        return isFeasibleBatch(items, offsets, numBins, capacity);
+    }
 }
@@ -50,10 +50,34 @@ public class BPSolverEntryPoint {
         return bps;
     }
 
+    /**
+     * Batch of instances, see BPSolver.isFeasibleBatch(byte[], int, int).
+     * Unlike getSolver(), it does not share any state between calls.
+     */
+    public byte[] isFeasibleBatch(byte[] buffer, int numBins, int capacity) {
+        return BPSolver.isFeasibleBatch(buffer, numBins, capacity);
+    }
+
+    /**
+     * Health check of the daemon pool (py/daemons.py).
+     */
+    public String ping() {
+        return "pong";
+    }
+
+    /**
+     * Optional argument: port of the gateway (default: Py4J default port).
+     * The line printed once the server listens is the readiness signal
+     * waited for by py/daemons.py.
+     */
     public static void main(String[] args) {
-        GatewayServer gatewayServer = new GatewayServer(new BPSolverEntryPoint());
+        int port = GatewayServer.DEFAULT_PORT;
+        if (args.length > 0)
+            port = Integer.parseInt(args[0]);
+        GatewayServer gatewayServer = new GatewayServer(new BPSolverEntryPoint(), port);
         gatewayServer.start();
-        System.out.println("Gateway Server Started");
+        System.out.println("Gateway Server Started on port " + port);
+        System.out.flush();
     }
 
 }
@@ -0,0 +1,115 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+"""
+Arc-flow graph of the bin packing problem (Valerio de Carvalho).
+
+The nodes are the loads 0..capacity of a bin, an item arc (u, u+s)
+places an item of size s, and a loss arc (u, v) leaves the capacity
+between u and v unused. A bin is a path from the source to the sink,
+and the instance is feasible iff num_bins units of flow cover the
+items of each size (see bpsolver.make_arcflow_model).
+
+Only the paths of items by decreasing size are built, with at most the
+number of items of each size. The graph is then compressed: a node u
+from which the longest path of items is l is moved to capacity - l,
+since nothing after it needs more room, and the nodes moved to the same
+load are merged.
+"""
+
+
+def size_counts(sizes):
+    """ [(size, count)] by decreasing size """
+    d = {}
+    for s in sizes:
+        d[s] = d.get(s, 0) + 1
+    return sorted(d.iteritems(), reverse=True)
+
+
+def arc_graph(sizes, capacity, compress=True):
+    """
+    (source, nodes, arcs) of the arc-flow graph of the items of given
+    sizes: the sink is capacity, nodes are sorted, and arcs are
+    (u, v, size) with size 0 for the loss arcs
+    """
+    reached = set([0])
+    item_arcs = set()
+    for s, count in size_counts(sizes):
+        added = set()
+        for u in reached:
+            for k in xrange(1, min(count, (capacity - u)/s) + 1):
+                item_arcs.add((u + (k-1)*s, u + k*s, s))
+                added.add(u + k*s)
+        reached |= added
+
+    source = 0
+    if compress:
+        # Longest path of items from each node, by decreasing load
+        longest = dict((u, 0) for u in reached)
+        for u, v, s in sorted(item_arcs, reverse=True):
+            longest[u] = max(longest[u], s + longest[v])
+        label = dict((u, capacity - l) for u, l in longest.iteritems())
+        item_arcs = set((label[u], label[v], s) for u, v, s in item_arcs)
+        source = label[0]
+        reached = set(label.itervalues())
+    reached.add(capacity)
+
+    nodes = sorted(reached)
+    arcs = sorted(item_arcs)
+    arcs.extend((nodes[k], nodes[k+1], 0) for k in xrange(len(nodes)-1))
+    return source, nodes, arcs
+
+
+def main():
+    source, nodes, arcs = arc_graph([5, 3, 3, 2], 8, compress=False)
+    assert (source, nodes) == (0, [0, 2, 3, 5, 6, 7, 8])
+    assert (5, 8, 3) in arcs and (3, 6, 3) in arcs and (6, 8, 2) in arcs
+    # Two items of size 3 at most: no arc from 6
+    assert (6, 9, 3) not in arcs
+    source, nodes, arcs = arc_graph([5, 3, 3, 2], 8)
+    # 0 -> 3 (at most 5 after it), 5 -> 6 -> 8 (at most 2 after it)...
+    assert source == 0 and len(nodes) < 7
+    for u, v, s in arcs:
+        assert u < v and v - u >= s
+    # Every path fits: the longest path of items is at most capacity
+    longest = dict((u, 0) for u in nodes)
+    for u, v, s in sorted(arcs, reverse=True):
+        longest[u] = max(longest[u], s + longest[v])
+    assert longest[source] <= 8
+    print "Dummy tests passed"
+
+if __name__ == "__main__":
+    main()
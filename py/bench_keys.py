@@ -0,0 +1,144 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+
+"""
+Benchmark of the memoization keys: string keys rebuilt from the bins
+(as the search used to do) against the incrementally maintained hashes.
+
+    python py/bench_keys.py [C N]
+"""
+
+import binascii
+import random
+import sys
+import timeit
+
+from bins import *
+from bpsolver import exact_key as exact_instance_key
+from bpsolver import make_key as make_instance_key
+from bpsolver import instance_key
+from state import GameState
+from upper_bounding import make_key
+
+
+def string_key(bins):
+    """ Former memoization key of the search """
+    l = []
+    d = {}
+    for b in bins:
+        l.append(b.remaining)
+        for i in b.items:
+            s = i.size
+            if s not in d: d[s] = 1
+            else: d[s] += 1
+    l.sort()
+    l.append(-1)
+    for i, j in d.iteritems():
+        l.append(i)
+        l.append(j)
+    return binascii.rlecode_hqx(' '.join(str(i) for i in l))
+
+
+def random_states(capacity, num_bins, count, seed=0):
+    """ Bins, and the corresponding GameState, reached by playing
+    random items in random bins """
+    rng = random.Random(seed)
+    states = []
+    for k in xrange(count):
+        bins = bin_factory(num_bins, capacity)
+        state = GameState(num_bins, capacity)
+        total = rng.randint(0, num_bins*capacity)
+        while total > 0:
+            w = rng.randint(1, min(total, capacity))
+            b = rng.randrange(num_bins)
+            bins[b].force_add(Item(w))
+            state.apply(w, state.loads.index(bins[b].used()-w))
+            total -= w
+        states.append((bins, state))
+    return states
+
+
+def bench(stmt, number):
+    """ Time per call, in microseconds """
+    return 1e6*min(timeit.repeat(stmt, number=number, repeat=3))/number
+
+
+def main():
+    if len(sys.argv) > 2:
+        capacity, num_bins = int(sys.argv[1]), int(sys.argv[2])
+    else:
+        capacity, num_bins = 14, 3
+    pairs = random_states(capacity, num_bins, 1000)
+    binss = [bins for bins, state in pairs]
+    states = [state for bins, state in pairs]
+    items = [[i for b in bins for i in b.items] for bins in binss]
+    n = len(states)
+    for bins, state in pairs:
+        h = 0
+        for b in bins: h += b.hash
+        assert h & HASH_MASK == make_key(state)[0]
+
+    def state_string():
+        for bins in binss: string_key(bins)
+    def state_hash():
+        for state in states: make_key(state)
+    def instance_string():
+        for it in items: exact_instance_key(it, num_bins, capacity)
+    def instance_hash():
+        for it in items: make_instance_key(it, num_bins, capacity)
+    def instance_incremental():
+        for state in states:
+            instance_key(state.items_hash, state.items_check,
+                    num_bins, capacity)
+    def add_remove():
+        for state in states:
+            state.undo(1, state.apply(1, 0))
+
+    print "Key building cost, %s bins of capacity %s (us per key)" % \
+        (num_bins, capacity)
+    print "  State, string key (before):\t\t%.2f" % (bench(state_string, 10)/n)
+    print "  State, hash (after):\t\t\t%.2f" % (bench(state_hash, 10)/n)
+    print "  Instance, string key (before):\t%.2f" % \
+        (bench(instance_string, 10)/n)
+    print "  Instance, hash from items:\t\t%.2f" % (bench(instance_hash, 10)/n)
+    print "  Instance, hash from state (after):\t%.2f" % \
+        (bench(instance_incremental, 10)/n)
+    print "  Incremental update (add + remove):\t%.2f" % \
+        (bench(add_remove, 10)/n)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+
+"""
+Benchmark of the MIP models of bin packing feasibility (see
+bpsolver.make_model and bpsolver.make_arcflow_model) on the exact queries
+recorded in the feasibility cache. Each query is solved with each model,
+and the result is checked against the recorded one.
+
+    python py/bench_models.py [--cache FILE] [--solver CBC] [--limit N]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import time
+
+import yaml
+
+import bpsolver
+from arcflow import arc_graph
+from bins import Item
+
+
+def recorded_queries(path):
+    """ (items, num_bins, capacity, feasible) of the feasibility cache,
+    keys being written by bpsolver.store_key """
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT key, feasible FROM feasibility").fetchall()
+    conn.close()
+    queries = []
+    for key, feasible in sorted(rows):
+        l = [int(x) for x in key.split()]
+        items = []
+        for k in xrange(2, len(l), 2):
+            items.extend(Item(l[k]) for c in xrange(l[k+1]))
+        queries.append((items, l[0], l[1], bool(feasible)))
+    return queries
+
+
+def run(model, queries, solver):
+    """ Build and solve times of the model on every query, and the
+    queries whose result differs from the recorded one """
+    build = []
+    solve = []
+    wrong = []
+    for items, num_bins, capacity, feasible in queries:
+        t = time.time()
+        mod = model(list(items), num_bins, capacity)
+        build.append(time.time() - t)
+        t = time.time()
+        sol = bpsolver.solve(mod, solver)
+        solve.append(time.time() - t)
+        if sol != feasible:
+            wrong.append(bpsolver.store_key(items, num_bins, capacity))
+    return build, solve, wrong
+
+
+def model_size(model, queries):
+    """ Mean numbers of variables and constraints of the model """
+    v = c = 0
+    for items, num_bins, capacity, feasible in queries:
+        mod = model(list(items), num_bins, capacity)
+        v += len(mod.variables())
+        c += len(mod.constraints)
+    n = float(len(queries))
+    return v/n, c/n
+
+
+def graph_size(queries, compress):
+    """ Mean numbers of nodes and arcs of the arc-flow graphs """
+    nodes = arcs = 0
+    for items, num_bins, capacity, feasible in queries:
+        s, n, a = arc_graph([i.size for i in items], capacity, compress)
+        nodes += len(n)
+        arcs += len(a)
+    n = float(len(queries))
+    return nodes/n, arcs/n
+
+
+def main():
+    p = argparse.ArgumentParser(description='Compares the MIP models on \
+            the queries of the feasibility cache')
+    p.add_argument('--cache', default=None,
+            help='SQLite file (default: feasibility-cache of config.conf)')
+    p.add_argument('--solver', default='CBC',
+            help='PuLP solver: GLPK, CBC, CPLEX, GUROBI (default: CBC)')
+    p.add_argument('--limit', type=int, default=200,
+            help='number of queries, sampled at random (default: 200, '
+            '0 for all)')
+    p.add_argument('--seed', type=int, default=0)
+    args = p.parse_args()
+
+    if args.solver in ('CHOCO', 'CHOCO4J', 'NATIVE'):
+        p.error("%s does not use the MIP models" % args.solver)
+
+    path = args.cache
+    if path is None:
+        dirn = os.path.abspath(os.path.dirname(sys.argv[0]))
+        stream = file(dirn + '/config.conf')
+        conf = yaml.load(stream)
+        stream.close()
+        if not conf.get('feasibility-cache'):
+            p.error("no feasibility-cache in config.conf, use --cache")
+        path = os.path.join(dirn, conf['feasibility-cache'])
+    if not os.path.exists(path):
+        p.error("%s not found: run searches with a feasibility cache first"
+                % path)
+
+    queries = recorded_queries(path)
+    if args.limit and len(queries) > args.limit:
+        queries = random.Random(args.seed).sample(queries, args.limit)
+    if not queries:
+        p.error("no recorded query in %s" % path)
+    bpsolver.init_solver(args.solver, '')
+
+    n = len(queries)
+    print "%d queries (%d feasible), %s" % (n,
+            sum(1 for q in queries if q[3]), args.solver)
+    print "Arc-flow graphs (mean nodes/arcs): %.1f/%.1f, compressed " \
+            "%.1f/%.1f" % (graph_size(queries, False) +
+                    graph_size(queries, True))
+    print "%-11s %9s %9s %10s %10s %10s" % ('model', 'variables',
+            'rows', 'build (ms)', 'solve (ms)', 'max (ms)')
+    failed = False
+    for name, model in (('assignment', bpsolver.make_model),
+            ('arcflow', bpsolver.make_arcflow_model)):
+        build, solve, wrong = run(model, queries, args.solver)
+        v, c = model_size(model, queries)
+        print "%-11s %9.1f %9.1f %10.2f %10.2f %10.2f" % (name, v, c,
+                1e3*sum(build)/n, 1e3*sum(solve)/n, 1e3*max(solve))
+        for key in wrong:
+            print "  wrong result for %s" % key
+            failed = True
+    bpsolver.terminate_solver(args.solver)
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
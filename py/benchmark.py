@@ -0,0 +1,314 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+"""
+Reproducible benchmark of the search over a grid of instances.
+
+Each case (C, N, solver, sampled weights) runs upper_bounding.run in a
+fresh process, without persistent feasibility cache nor decision tree,
+and records its value, wall time, nodes, feasibility checks, exact
+solver calls and peak memory.
+
+    python py/benchmark.py run -o results.json [--solvers NATIVE CBC]
+    python py/benchmark.py compare old.json new.json
+
+compare flags the cases whose value changed, and the ones whose time,
+nodes, calls or memory grew by more than --threshold.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import platform
+import resource
+import subprocess
+import multiprocessing
+
+import upper_bounding
+
+# (C, N): the series of the paper up to 14/3 (traces/backtrack_14-3_*)
+GRID = [(7, 3), (9, 3), (10, 3), (11, 3), (12, 3), (13, 3), (14, 3),
+        (8, 4), (10, 4)]
+# (C, N, R, seeds): -r R weights sampled in 1..C
+SAMPLED = [(14, 3, 10, (1, 2, 3)), (16, 3, 10, (1, 2, 3))]
+
+SOLVERS = ["NATIVE", "CBC", "GLPK", "CPLEX", "GUROBI", "CHOCO", "CHOCO4J"]
+
+# Figures compared, and the smallest change worth a flag
+FIGURES = [('time', 0.5), ('nodes', 1000), ('feasibility checks', 100),
+        ('exact calls', 10), ('peak MB', 16)]
+
+
+def available(solver):
+    """ True if the backend can run here """
+    if solver == "NATIVE":
+        return True
+    if solver in ("CHOCO", "CP"):
+        try:
+            import jpype
+        except ImportError:
+            return False
+        return True
+    if solver in ("CHOCO4J", "CP4J"):
+        try:
+            import py4j
+        except ImportError:
+            return False
+        return spawn_ok(['java', '-version'])
+    try:
+        import pulp
+    except ImportError:
+        return False
+    cls = {'CBC': 'PULP_CBC_CMD', 'CPLEX': 'CPLEX', 'GUROBI': 'GUROBI',
+            'COIN': 'COIN'}.get(solver, 'GLPK')
+    return bool(getattr(pulp, cls)(msg=0).available())
+
+
+def spawn_ok(args):
+    try:
+        devnull = open(os.devnull, 'w')
+        subprocess.call(args, stdout=devnull, stderr=devnull)
+        devnull.close()
+    except OSError:
+        return False
+    return True
+
+
+def weights_of(capacity, r=None, seed=None):
+    """ The weights of upper_bounding.py C [-r R], with a fixed seed """
+    if r:
+        rnd = random.Random(seed)
+        weights = rnd.sample(xrange(1, capacity+1), r)
+    else:
+        weights = range(1, capacity+1)
+    weights.sort()
+    return weights
+
+
+def cases(solvers, grid=GRID, sampled=SAMPLED):
+    for solver in solvers:
+        for capacity, num_bins in grid:
+            yield {'C': capacity, 'N': num_bins, 'solver': solver}
+        for capacity, num_bins, r, seeds in sampled:
+            for seed in seeds:
+                yield {'C': capacity, 'N': num_bins, 'solver': solver,
+                        'r': r, 'seed': seed}
+
+
+def case_key(case):
+    key = "%s %d/%d" % (case['solver'], case['C'], case['N'])
+    if case.get('r'):
+        key += " r=%d seed=%d" % (case['r'], case['seed'])
+    return key
+
+
+def measure(case, tt_size=64, fcache_path=None, daemon_file=None):
+    """
+    Runs the search of case in this process, which shall not have run
+    any other search. Returns the figures of the run.
+    """
+    ub = upper_bounding
+    ub.SOLVER = case['solver']
+    ub.tt_size = tt_size
+    ub.fcache_path = fcache_path
+    if daemon_file: ub.daemon_file = daemon_file
+    capacity, num_bins = case['C'], case['N']
+    weights = weights_of(capacity, case.get('r'), case.get('seed'))
+    lb = 4*capacity/3
+
+    # The search writes its progress on stdout
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    t0 = time.time()
+    try:
+        val = ub.run(weights, num_bins, capacity, lb, trace=False)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    t0 = time.time() - t0
+
+    res = dict(case)
+    res.update({'value': val, 'improved': val > lb, 'time': t0,
+        'nodes': ub.nodes, 'feasibility checks': ub.fcalls,
+        'exact calls': ub.bpsolver.calls, 'probes': ub.bpsolver.probes,
+        'bound rejects': dict(ub.bpsolver.bound_rejects),
+        'packer wins': dict(ub.bpsolver.packer_wins),
+        'peak MB': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss/1024.})
+    return res
+
+
+def measure_in_child(args):
+    """ measure() in a new process, so that every case starts from empty
+    caches and has its own peak memory """
+    conn_r, conn_w = multiprocessing.Pipe(False)
+    def target():
+        try:
+            conn_w.send(measure(*args))
+        except Exception as e:
+            conn_w.send({'error': repr(e)})
+    p = multiprocessing.Process(target=target)
+    p.start()
+    # Only the child holds the write end: its death ends the wait
+    conn_w.close()
+    try:
+        res = conn_r.recv()
+    except EOFError:
+        res = None
+    p.join()
+    if res is None or 'error' in res:
+        res = dict(args[0], error=res and res['error'] or
+                "exit code %s" % p.exitcode)
+    return res
+
+
+def git_revision():
+    try:
+        dirn = os.path.dirname(os.path.abspath(__file__))
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                cwd=dirn).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_all(solvers, out, tt_size=64, repeat=1, only=None):
+    results = []
+    meta = {'revision': git_revision(), 'host': socket.gethostname(),
+            'python': platform.python_implementation() + " " +
+            platform.python_version(), 'tt-size': tt_size,
+            'repeat': repeat, 'date': time.strftime("%Y-%m-%d %H:%M:%S")}
+    for case in cases(solvers):
+        if only and not any(o in case_key(case) for o in only):
+            continue
+        # The best of repeat runs
+        best = None
+        for k in xrange(repeat):
+            res = measure_in_child((case, tt_size))
+            if best is None or res.get('time') < best.get('time'):
+                best = res
+        results.append(best)
+        if 'error' in best:
+            print "%-32s error: %s" % (case_key(case), best['error'])
+        else:
+            print "%-32s value %-4s %8.2fs %9d nodes %6d calls %7.1f MB" % \
+                (case_key(case), best['value'], best['time'],
+                best['nodes'], best['exact calls'], best['peak MB'])
+        sys.stdout.flush()
+        # Partial results survive an interrupted benchmark
+        f = open(out, 'w')
+        json.dump({'meta': meta, 'results': results}, f, indent=1,
+                sort_keys=True)
+        f.close()
+    return results
+
+
+def compare(old, new, threshold=0.1):
+    """
+    Returns the regressions of the results new against old: lines
+    describing changed values and figures larger by more than threshold
+    (relative) and by more than the minimal change of FIGURES.
+    """
+    old = dict((case_key(r), r) for r in old['results'])
+    flags = []
+    for r in new['results']:
+        key = case_key(r)
+        o = old.get(key)
+        if o is None or 'error' in o:
+            continue
+        if 'error' in r:
+            flags.append("%s: %s" % (key, r['error']))
+            continue
+        if r['value'] != o['value']:
+            flags.append("%s: value %s instead of %s" % (key, r['value'],
+                o['value']))
+        for fig, minimum in FIGURES:
+            a, b = o[fig], r[fig]
+            if b - a > minimum and b > a*(1 + threshold):
+                flags.append("%s: %s %s -> %s (%+.0f%%)" % (key, fig,
+                    fmt(a), fmt(b), 100.*(b - a)/a))
+    return flags
+
+
+def fmt(x):
+    return "%.2f" % x if isinstance(x, float) else str(x)
+
+
+def main():
+    p = argparse.ArgumentParser(description='Benchmark of the search')
+    sub = p.add_subparsers(dest='command')
+    r = sub.add_parser('run', help='run the benchmark')
+    r.add_argument('-o', '--output', default='benchmark.json')
+    r.add_argument('--solvers', nargs='+', default=None,
+            help='backends (default: the available ones among %s)'
+                % " ".join(SOLVERS))
+    r.add_argument('--tt-size', type=int, default=64,
+            help='transposition table size in MB (default: 64)')
+    r.add_argument('--repeat', type=int, default=1,
+            help='runs per case, the fastest is kept (default: 1)')
+    r.add_argument('--only', nargs='+',
+            help='only the cases whose name contains one of these\
+                strings, e.g. "NATIVE 14/3"')
+    c = sub.add_parser('compare', help='flag regressions')
+    c.add_argument('old')
+    c.add_argument('new')
+    c.add_argument('--threshold', type=float, default=0.1,
+            help='relative increase flagged (default: 0.1)')
+    args = p.parse_args()
+
+    if args.command == 'run':
+        sys.argv[0] = upper_bounding.__file__
+        upper_bounding.config()
+        solvers = args.solvers or [s for s in SOLVERS if available(s)]
+        print "Solvers: %s" % " ".join(solvers)
+        run_all(solvers, args.output, args.tt_size, args.repeat, args.only)
+    else:
+        f = open(args.old)
+        old = json.load(f)
+        f.close()
+        f = open(args.new)
+        new = json.load(f)
+        f.close()
+        flags = compare(old, new, args.threshold)
+        for line in flags:
+            print line
+        print "%d regression(s)" % len(flags)
+        sys.exit(1 if flags else 0)
+
+if __name__ == "__main__":
+    main()
@@ -63,6 +63,44 @@ class Item:
         return Item(self.size + other)
 
 
+################## State hashing ####################
+
+# Game states are hashed incrementally (Zobrist-like): every item size and
+# every bin load is mapped to a random word, and a state hashes to the sum of
+# the words of its items and bin loads. Sums are symmetric under bin
+# permutations and are updated in O(1) when an item is added or removed.
+# An independent check word is computed the same way to detect collisions.
+# Words are derived from their index so that keys are stable across runs.
+# 60 bits keep the sum over a few bins within a machine int.
+HASH_MASK = (1 << 60) - 1
+CHECK_MASK = (1 << 30) - 1
+
+def mix64(x):
+    """ splitmix64 finalizer """
+    x = (x + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return x ^ (x >> 31)
+
+class ZobristTable(dict):
+    """ index -> random word, filled on demand """
+    def __init__(self, seed, mask):
+        dict.__init__(self)
+        self.seed = seed
+        self.mask = mask
+
+    def __missing__(self, index):
+        v = mix64(mix64(self.seed) ^ (hash(index) & 0xFFFFFFFFFFFFFFFF))
+        v &= self.mask
+        self[index] = v
+        return v
+
+ITEM_HASH = ZobristTable(1, HASH_MASK)
+ITEM_CHECK = ZobristTable(2, CHECK_MASK)
+LOAD_HASH = ZobristTable(3, HASH_MASK)
+LOAD_CHECK = ZobristTable(4, CHECK_MASK)
+
+
 ################## Bins management ####################
 
 # For efficient decreasing remaining capacity sort, use :
@@ -85,6 +123,11 @@ class Bin:
         self.capacity = capacity
         self.remaining = capacity
         self.items = []
+        # Hash and check words of the items, and of items plus load
+        self.items_hash = 0
+        self.items_check = 0
+        self.hash = LOAD_HASH[0]
+        self.check = LOAD_CHECK[0]
 
     def __str__(self):
         strn = "   Used : "+str(self.capacity-self.remaining)
@@ -107,18 +150,29 @@ class Bin:
     def add(self, item):
         if (not isinstance(item, Item)) or (item.size > self.remaining):
             return False
-        self.remaining -= item.size
-        self.items.append(item)
+        self.force_add(item)
         return True
 
     def force_add(self, item):
-        self.remaining -= item.size
+        s = item.size
+        u = self.capacity - self.remaining
+        self.remaining -= s
         self.items.append(item)
+        self.items_hash = (self.items_hash + ITEM_HASH[s]) & HASH_MASK
+        self.items_check = (self.items_check + ITEM_CHECK[s]) & CHECK_MASK
+        self.hash = (self.items_hash + LOAD_HASH[u+s]) & HASH_MASK
+        self.check = (self.items_check + LOAD_CHECK[u+s]) & CHECK_MASK
 
     def rem_last(self):
         if not self.items:
             return False
-        self.remaining += self.items.pop().size
+        s = self.items.pop().size
+        self.remaining += s
+        u = self.capacity - self.remaining
+        self.items_hash = (self.items_hash - ITEM_HASH[s]) & HASH_MASK
+        self.items_check = (self.items_check - ITEM_CHECK[s]) & CHECK_MASK
+        self.hash = (self.items_hash + LOAD_HASH[u]) & HASH_MASK
+        self.check = (self.items_check + LOAD_CHECK[u]) & CHECK_MASK
         return True
 
     def used(self):
@@ -127,6 +181,10 @@ class Bin:
     def clean(self):
         self.remaining = self.capacity
         self.items = []
+        self.items_hash = 0
+        self.items_check = 0
+        self.hash = LOAD_HASH[0]
+        self.check = LOAD_CHECK[0]
 
 
 ################## Generator ####################
@@ -41,34 +41,61 @@ Solver to the bin packing problem, using integer programming
 
 import os
 import sys
+import time
 # Required for pypy to locate py4j and pulp
 sys.path.extend(['/usr/local/lib/python2.7/dist-packages/py4j-0.8-py2.7.egg', '/usr/local/lib/python2.7/dist-packages', '/usr/lib/python2.7/dist-packages'])
 
 import random
 import binascii
+import struct
 
 from bins import *
 from heuristic import *
+from native import native_solve
+import vectorized
+import stats
+from fcache import FeasibilityCache
+from frontier import Frontier, count_vector
+from prefetch import Prefetcher, Batch
+from arcflow import arc_graph, size_counts
 
 
 ################## Bin Packing modeling ####################
 
 # Memorize problem solved
 mem = {}
-
-def init_solver(solver, lib):
+# Minimal infeasible and maximal feasible item multisets, per
+# (num_bins, capacity) (see frontier.py)
+frontiers = {}
+use_frontier = True
+
+def frontier(num_bins, capacity):
+    f = frontiers.get((num_bins, capacity))
+    if f is None:
+        f = frontiers[(num_bins, capacity)] = Frontier()
+    return f
+# Exact results shared on disk with other runs (see open_cache)
+pcache = None
+
+def init_solver(solver, lib, spawn=True, daemons=1, daemon_file=None):
+    """
+    Imports the modules required by the solver.
+    For CHOCO4J, a pool of solver daemons is started (see
+    daemons.py) unless spawn is False, in which case the running ones
+    listed in daemon_file are used.
+    """
     if solver == "CHOCO" or solver == "CP":
         global jpype
         import jpype
     elif solver == "CHOCO4J" or solver == "CP4J":
-        global JavaGateway, GatewayClient
-        from py4j.java_gateway import JavaGateway, GatewayClient
-        from subprocess import Popen
-        import time
-        global p4jproc
-        args = ['java', '-jar', lib+'/solver.jar']
-        p4jproc = Popen(args)
-        time.sleep(1) # wait a second to make sure the server is really open
+        global solver_pool
+        from daemons import SolverPool
+        solver_pool = SolverPool(lib+'/solver.jar', daemons,
+                state_file=daemon_file, owner=spawn)
+        if spawn:
+            solver_pool.start()
+    elif solver == "NATIVE":
+        pass
     else:
         #import yaposib
         plp = __import__('pulp',globals(),locals())
@@ -76,9 +103,41 @@ def init_solver(solver, lib):
 
 def terminate_solver(solver):
     if solver == "CHOCO4J" or solver == "CP4J":
-        p4jproc.kill()
+        solver_pool.stop()
+    if pcache:
+        pcache.flush()
+
+def open_cache(path):
+    """ Share exact feasibility results through an on-disk cache """
+    global pcache
+    pcache = FeasibilityCache(path)
+    return pcache
 
 def make_key(items, num_bins, capacity):
+    """ Hash and check words of the instance (see bins.ITEM_HASH) """
+    h = 0
+    c = 0
+    for i in items:
+        h += ITEM_HASH[i.size]
+        c += ITEM_CHECK[i.size]
+    return instance_key(h, c, num_bins, capacity)
+
+def instance_key(items_hash, items_check, num_bins, capacity):
+    """ Key of an instance from the hash and check words of its items """
+    t = (num_bins, capacity)
+    return ((items_hash + ITEM_HASH[t]) & HASH_MASK,
+            (items_check + ITEM_CHECK[t]) & CHECK_MASK)
+
+def recall_feasibility(key):
+    """ Known result for the instance of given key, None if unknown """
+    t, check = key
+    e = mem.get(t)
+    if e is not None and e[0] == check:
+        return e[1]
+    return None
+
+def exact_key(items, num_bins, capacity):
+    """ Collision free key, used when two instances share a hash """
     d = {}
     for i in items:
         s = i.size
@@ -97,51 +156,554 @@ def make_key(items, num_bins, capacity):
     return binascii.rlecode_hqx(' '.join(str(i) for i in l))
     #return tuple(l)
 
+def store_key(items, num_bins, capacity):
+    """ Same content as exact_key, in a canonical (sorted) text form
+    that remains valid across processes """
+    d = {}
+    for i in items:
+        s = i.size
+        if s in d: d[s] += 1
+        else: d[s] = 1
+    l = [num_bins, capacity]
+    for i in sorted(d):
+        l.append(i)
+        l.append(d[i])
+    return ' '.join(str(i) for i in l)
+
 calls = 0
-def is_feasible(items, num_bins, capacity, solver="GLPK"):
+def is_feasible(items, num_bins, capacity, solver="GLPK", key=None):
+    """
+    Return True iff items can be packed into num_bins bins.
+    key -- make_key(items, num_bins, capacity), if already known
+    """
+    sol, t, check = prefilter(items, num_bins, capacity, key)
+    if sol is not None:
+        return sol
+
+    count_call()
+    sol = exact_solve(items, num_bins, capacity, solver)
+    record(items, num_bins, capacity, t, check, sol)
+    return sol
+
+def is_feasible_batch(instances, num_bins, capacity, solver="GLPK",
+        keys=None):
+    """
+    is_feasible for a list of item lists. Instances which need the exact
+    solver are sent at once to the batch endpoint of the Java backends.
+    """
+    if keys is None:
+        keys = [None]*len(instances)
+    res = [None]*len(instances)
+    todo = []
+    for n, items in enumerate(instances):
+        sol, t, check = prefilter(items, num_bins, capacity, keys[n])
+        res[n] = sol
+        if sol is None:
+            todo.append((n, t, check))
+    if not todo:
+        return res
+
+    for n, t, check in todo:
+        count_call()
+    batch = [instances[n] for n, t, check in todo]
+    if solver in BATCH_SOLVERS:
+        if stats.enabled:
+            stats.count('resolved: exact', len(batch))
+            t0 = time.time()
+        if solver == "CHOCO" or solver == "CP":
+            sols = CPSolve_batch(batch, num_bins, capacity)
+        else:
+            sols = py4j_solve_batch(batch, num_bins, capacity)
+        if stats.enabled:
+            stats.observe(solver + " batch", time.time() - t0)
+    else:
+        sols = [exact_solve(items, num_bins, capacity, solver)
+                for items in batch]
+
+    for (n, t, check), sol in zip(todo, sols):
+        record(instances[n], num_bins, capacity, t, check, sol)
+        res[n] = sol
+    return res
+
+# Infeasible instances rejected by each lower bound (see heuristic.BOUNDS)
+bound_rejects = {}
+def prefilter(items, num_bins, capacity, key=None):
+    """
+    Cheap stages of is_feasible: trivial cases, known results, packings
+    of parent instances, known subsets and supersets, heuristics, lower
+    bounds.
+    Returns the result (None if the exact solver is needed), and the key
+    and check word of the instance in mem.
+    """
     ret, res = is_trivial(items, num_bins, capacity)
     if ret:
-        return res
+        if stats.enabled: stats.count('resolved: trivial')
+        return res, None, None
     global mem
-    t = make_key(items, num_bins, capacity)
+    if key is None:
+        key = make_key(items, num_bins, capacity)
+    t, check = key
     if t in mem:
-        return mem[t]
+        c, sol = mem[t]
+        if c == check:
+            if stats.enabled: count_hit()
+            return sol, t, check
+        # Hash collision: this instance is stored under its exact key
+        t = exact_key(items, num_bins, capacity)
+        if t in mem:
+            if stats.enabled: count_hit()
+            return mem[t][1], t, check
+    if stats.enabled: stats.count('mem: miss')
+    # Solved ahead of the search
+    if prefetcher is not None:
+        sol = prefetcher.take(key)
+        if sol is not None:
+            if stats.enabled: stats.count('resolved: prefetch')
+            record(items, num_bins, capacity, t, check, sol)
+            return sol, t, check
+    # Items of a packed instance plus one: insert it in the packing
+    parent, w = parent_witness(items, key)
+    if parent is not None:
+        bins = insert_item(parent, w, capacity)
+        if bins is not None:
+            if stats.enabled: stats.count('resolved: witness')
+            store_witness(key, bins)
+            remember(items, num_bins, capacity, t, check, True)
+            return True, t, check
+    # Known subset (resp. superset) of a feasible (infeasible) instance
+    if use_frontier:
+        sol = frontier(num_bins, capacity).lookup(
+                count_vector(items, capacity))
+        if sol is not None:
+            if stats.enabled: stats.count('resolved: frontier')
+            mem[t] = (check, sol)
+            return sol, t, check
     ret, res = heuristics(items, num_bins, capacity)
     if ret:
+        if stats.enabled: stats.count('resolved: heuristics')
         sol = res
-        mem[t] = sol
-        return sol
-
-    """
-    Current implemented bound is not interesting enough
-    m = compute_min_bins(items, capacity)
-    if m > num_bins:
-        sol = False
-        mem[t] = sol
-        return sol
-    else:
-    """
-
-    global calls
-    calls += 1
-    sys.stdout.write("\rCP calls:\t%d" %calls)
-    sys.stdout.flush()
+        remember(items, num_bins, capacity, t, check, sol)
+        return sol, t, check
+
+    # Lower bounds on the number of bins (items are sorted by heuristics)
+    name = exceeding_bound(items, num_bins, capacity)
+    if name:
+        bound_rejects[name] = bound_rejects.get(name, 0) + 1
+        if stats.enabled: stats.count('resolved: ' + name)
+        remember(items, num_bins, capacity, t, check, False)
+        return False, t, check
+
+    if pcache:
+        k = store_key(items, num_bins, capacity)
+        sol = pcache.get(k)
+        if sol is not None:
+            if stats.enabled: stats.count('resolved: pcache')
+            remember(items, num_bins, capacity, t, check, sol)
+            return sol, t, check
+
+    return None, t, check
+
+def exact_solve(items, num_bins, capacity, solver="GLPK"):
+    """ Decides the instance with the exact backend """
+    if stats.enabled:
+        stats.count('resolved: exact')
+        t0 = time.time()
+    sol = backend_solve(items, num_bins, capacity, solver)
+    if stats.enabled:
+        stats.observe(solver, time.time() - t0)
+    return sol
 
+def backend_solve(items, num_bins, capacity, solver="GLPK"):
     if solver == "CHOCO" or solver == "CP":
         sol = CPSolve(items, num_bins, capacity)
 
     elif solver == "CHOCO4J" or solver == "CP4J":
         sol = py4j_solve(items, num_bins, capacity)
 
+    elif solver == "NATIVE":
+        sol = native_solve(items, num_bins, capacity)
+
     else:
-        mod = make_model(items, num_bins, capacity)
+        if mip_model(solver) == 'arcflow':
+            mod = make_arcflow_model(items, num_bins, capacity)
+        else:
+            mod = make_model(items, num_bins, capacity)
         sol = solve(mod, solver)
     #sol = grb_solve(items, num_bins, capacity)
+    #sol = grb_arcflow_solve(items, num_bins, capacity)
     #assert grb_solve(items, num_bins, capacity) == sol
-
-    mem[t] = sol
     return sol
 
+def record(items, num_bins, capacity, t, check, sol):
+    """ Stores the result of the exact solver """
+    if pcache:
+        pcache.put(store_key(items, num_bins, capacity), sol)
+    remember(items, num_bins, capacity, t, check, sol)
+
+def remember(items, num_bins, capacity, t, check, sol):
+    """ Stores a result in mem and in the frontier index """
+    mem[t] = (check, sol)
+    if use_frontier:
+        frontier(num_bins, capacity).store(count_vector(items, capacity),
+                sol)
+
+def count_hit():
+    stats.count('mem: hit')
+    stats.count('resolved: mem')
+
+def count_call():
+    global calls
+    calls += 1
+    sys.stdout.write("\rCP calls:\t%d" %calls)
+    sys.stdout.flush()
+
+################## Witness packings ####################
+
+# Packings of feasible instances (see heuristic.repairs): key -> (check,
+# bins). The instance of a child node is the one of its parent plus an
+# item, which usually fits in the packing of the parent.
+witnesses = {}
+max_witnesses = 2**18
+
+def store_witness(key, bins):
+    if len(witnesses) >= max_witnesses:
+        # Starts again rather than tracking the oldest packings
+        witnesses.clear()
+    t, check = key
+    witnesses[t] = (check, bins)
+
+def recall_witness(key):
+    """ Known packing of the instance of given key, None if unknown """
+    t, check = key
+    e = witnesses.get(t)
+    if e is not None and e[0] == check:
+        return e[1]
+    return None
+
+def parent_witness(items, key):
+    """
+    (bins, w): known packing of items but one item of size w, for the
+    instance of given key. (None, None) if there is none.
+    """
+    if not witnesses:
+        return None, None
+    t, check = key
+    tried = set()
+    for i in items:
+        w = i.size
+        if w in tried:
+            continue
+        tried.add(w)
+        bins = recall_witness(((t - ITEM_HASH[w]) & HASH_MASK,
+                (check - ITEM_CHECK[w]) & CHECK_MASK))
+        if bins is not None:
+            return bins, w
+    return None, None
+
+################## Largest feasible item ####################
+
+# Largest feasible next weight, per item multiset (see largest_feasible)
+largest_mem = {}
+largest_weights = None
+probes = 0
+# Candidate weights tried per round trip by the backends with a batch
+# endpoint; the others use a plain binary search
+batch_probes = 3
+BATCH_SOLVERS = ("CHOCO", "CP", "CHOCO4J", "CP4J")
+# False once the solver classes turn out to be built without
+# isFeasibleBatch: instances are then solved one by one
+batch_endpoint = True
+
+def has_batch(solver):
+    return batch_endpoint and solver in BATCH_SOLVERS
+# Candidate weights classified with NumPy when it is installed
+vectorize = vectorized.available
+
+def recall_largest(key, weights):
+    """ Known answer of largest_feasible for the instance of given key,
+    None if unknown """
+    if weights is not largest_weights:
+        return None
+    t, check = key
+    e = largest_mem.get(t)
+    if e is not None and e[0] == check:
+        if stats.enabled: stats.count('oracle: hit')
+        return e[1]
+    if stats.enabled: stats.count('oracle: miss')
+    return None
+
+def feasibility_range(items, num_bins, capacity, bins=None):
+    """
+    (lo, hi, bins) such that items plus an item of size w can be packed
+    into num_bins bins if w <= lo, and cannot if w > hi.
+    bins -- a known packing of items (see witnesses), else the packing
+    found by first fit, or None
+    """
+    # Infeasible above hi: total size, and more than 2 big items per bin
+    hi = min(capacity, num_bins*capacity - sum(i.size for i in items))
+    if len(items) >= num_bins:
+        big = 0
+        half = 0
+        for i in items:
+            if 2*i.size > capacity: big += 1
+            elif 2*i.size == capacity: half += 1
+        if 2*(big+1) + half > 2*num_bins:
+            hi = min(hi, capacity/2)
+            if 2*big + half + 1 > 2*num_bins:
+                hi = min(hi, (capacity-1)/2)
+
+    # Feasible up to lo: fits in a packing of items, possibly after a
+    # local move (see heuristic.insertion_room)
+    if bins is None:
+        if len(items) < num_bins:
+            bins = tuple((i.size,) for i in items) + \
+                ((),)*(num_bins - len(items))
+        else:
+            tmp_bins = bin_factory(num_bins, capacity)
+            if first_fit(sorted(items, reverse=True), tmp_bins):
+                bins = tuple(tuple(i.size for i in b.items)
+                        for b in tmp_bins)
+    lo = insertion_room(bins, capacity) if bins is not None else 0
+    return lo, hi, bins
+
+def search_range(items, weights, num_bins, capacity, key, count=True):
+    """
+    (best, cands): weights up to best are feasible, and the largest
+    feasible weight is best or among cands (by decreasing order), see
+    largest_feasible. count -- count the stages in stats
+    """
+    count = count and stats.enabled
+    # A packing of items: known, or the packing of the parent instance
+    # plus an item, or found by first fit
+    bins = recall_witness(key)
+    if bins is None:
+        parent, w = parent_witness(items, key)
+        if parent is not None:
+            bins = insert_item(parent, w, capacity)
+        if count:
+            stats.count('witness: ' + ('inserted' if bins else 'miss'))
+    elif count: stats.count('witness: hit')
+    lo, hi, bins = feasibility_range(items, num_bins, capacity, bins)
+    if bins is not None:
+        store_witness(key, bins)
+    cands = [w for w in weights if lo < w <= hi]
+    if vectorize and cands:
+        # The weights left tested at once: feasible up to the largest
+        # feasible one, infeasible from the smallest infeasible one
+        sizes = sorted((i.size for i in items), reverse=True)
+        feasible, infeasible, undecided = vectorized.classify(sizes,
+                cands, num_bins, capacity)
+        if feasible:
+            lo = feasible[0]
+        if infeasible:
+            hi = min(infeasible) - 1
+        if count:
+            stats.count('vectorized: feasible', len(feasible))
+            stats.count('vectorized: infeasible', len(infeasible))
+            stats.count('vectorized: undecided', len(undecided))
+
+    # Candidates in ]lo, hi], by decreasing order
+    cands = [w for w in weights if lo < w <= hi]
+    best = 0
+    for w in weights:
+        if w <= min(lo, hi):
+            best = w
+            break
+    return best, cands
+
+def probe_indices(a, b, split):
+    """ Indices of cands probed at once in [a, b[ by largest_feasible """
+    return sorted(set(a + (b-a)*j/(split+1) for j in xrange(1, split+1)))
+
+def largest_feasible(items, weights, num_bins, capacity, solver="GLPK",
+        key=None):
+    """
+    Largest w in weights (sorted by decreasing order) such that items
+    plus an item of size w can be packed into num_bins bins.
+    Returns 0 if there is no such weight.
+
+    Feasibility is monotone in the size of the added item: weights are
+    filtered all at once by the necessary conditions of is_trivial and
+    heuristics and by the free space of a heuristic packing (see
+    feasibility_range). With NumPy, the weights left are classified at
+    once by stronger tests (see vectorized.classify). The remaining
+    candidates are binary searched with is_feasible.
+    """
+    global largest_mem, largest_weights, probes
+    if weights is not largest_weights:
+        largest_mem = {}
+        largest_weights = weights
+    if key is None:
+        key = make_key(items, num_bins, capacity)
+    t, check = key
+    e = speculated.pop(t, None)
+    if e is not None and e[0] == check and weights is largest_weights:
+        best, cands = e[1], e[2]
+    else:
+        best, cands = search_range(items, weights, num_bins, capacity, key)
+
+    # Search for the largest feasible candidate: binary search, or
+    # batch_probes midpoints per round trip for the batch backends
+    split = batch_probes if has_batch(solver) else 1
+    a, b = 0, len(cands)
+    # Probes of the next round, solved while this one is
+    batch = Batch() if prefetcher is not None else None
+    while a < b:
+        ms = probe_indices(a, b, split)
+        if batch:
+            submit_probes(items, cands, [(a, ms[0]), (ms[-1]+1, b)], split,
+                    num_bins, capacity, key, batch)
+        instances = []
+        keys = []
+        for m in ms:
+            w = cands[m]
+            instances.append(items + [Item(w)])
+            keys.append(((t + ITEM_HASH[w]) & HASH_MASK,
+                (check + ITEM_CHECK[w]) & CHECK_MASK))
+        probes += len(ms)
+        if len(ms) == 1:
+            sols = [is_feasible(instances[0], num_bins, capacity, solver,
+                keys[0])]
+        else:
+            sols = is_feasible_batch(instances, num_bins, capacity, solver,
+                    keys)
+        # cands[ms[j]] infeasible implies the smaller indices are too
+        a_next, b_next = ms[-1]+1, b
+        for j, m in enumerate(ms):
+            if sols[j]:
+                b_next = m
+                a_next = ms[j-1]+1 if j > 0 else a
+                break
+        a, b = a_next, b_next
+    if batch:
+        batch.cancel()
+    if a < len(cands):
+        best = cands[a]
+
+    largest_mem[t] = (check, best)
+    return best
+
+
+################## Prefetch ####################
+
+# Feasibility queries solved ahead of the search by threads, when
+# started (see prefetch.py)
+prefetcher = None
+# Queries submitted at once by submit_probes: the next probes of the
+# search of largest_feasible, for either outcome of the previous ones
+prefetch_probes = 3
+# search_range of the instances of prefetch_largest, until
+# largest_feasible uses it: key -> (check, best, cands)
+speculated = {}
+max_speculated = 2**12
+
+def start_prefetch(solver, threads, queue_size):
+    global prefetcher
+    setup = None
+    if solver == "CHOCO" or solver == "CP":
+        setup = jpype.attachThreadToJVM
+    prefetcher = Prefetcher(lambda items, num_bins, capacity:
+            speculative_solve(items, num_bins, capacity, solver),
+            threads, queue_size, setup)
+
+def stop_prefetch():
+    """ Ends the threads; the prefetcher is kept for its stats """
+    if prefetcher is not None:
+        prefetcher.stop()
+        collect_prefetched()
+
+def speculative_solve(items, num_bins, capacity, solver):
+    """ is_feasible in the prefetch threads: the stages which use no
+    shared state, then the exact backend """
+    ret, res, name = packing_heuristics(items, num_bins, capacity)
+    if ret:
+        return res
+    if exceeding_bound(items, num_bins, capacity):
+        return False
+    return backend_solve(items, num_bins, capacity, solver)
+
+def exact_needs():
+    """ Instances decided by the exact solver so far, in the search
+    thread or ahead of it """
+    return calls + (prefetcher.taken if prefetcher is not None else 0)
+
+def collect_prefetched():
+    """ Records the results of the prefetch threads not used yet """
+    for (t, check), items, num_bins, capacity, sol in prefetcher.collect():
+        if t not in mem:
+            record(items, num_bins, capacity, t, check, sol)
+
+def prefetch_largest(items, weights, num_bins, capacity, solver, key,
+        batch):
+    """
+    Submits to the prefetcher, in batch, the queries which
+    largest_feasible(items, weights, num_bins, capacity, solver, key)
+    will solve first, unless its answer is known
+    """
+    t, check = key
+    if weights is largest_weights:
+        e = largest_mem.get(t)
+        if e is not None and e[0] == check:
+            return
+    best, cands = search_range(items, weights, num_bins, capacity, key,
+            count=False)
+    if len(speculated) >= max_speculated:
+        speculated.clear()
+    speculated[t] = (check, best, cands)
+    split = batch_probes if has_batch(solver) else 1
+    submit_probes(items, cands, [(0, len(cands))], split, num_bins,
+            capacity, key, batch)
+
+def submit_probes(items, cands, ranges, split, num_bins, capacity, key,
+        batch):
+    """
+    Submits in batch the probes of largest_feasible searching cands in
+    the intervals of ranges, then in their subintervals, up to
+    prefetch_probes probes
+    """
+    t, check = key
+    submitted = 0
+    while ranges and submitted < prefetch_probes:
+        a, b = ranges.pop(0)
+        if a >= b:
+            continue
+        ms = probe_indices(a, b, split)
+        for m in ms:
+            w = cands[m]
+            k = ((t + ITEM_HASH[w]) & HASH_MASK,
+                    (check + ITEM_CHECK[w]) & CHECK_MASK)
+            if recall_feasibility(k) is None:
+                prefetcher.submit(batch, k, items + [Item(w)], num_bins,
+                        capacity)
+            submitted += 1
+        # Feasible probe: the search goes on below it, else above
+        ranges.append((a, ms[0]))
+        ranges.append((ms[-1] + 1, b))
+
+
+################## MIP models ####################
+
+MIP_MODELS = ('assignment', 'arcflow')
+# Model of the MIP backends: a name of MIP_MODELS, or a dictionary
+# solver -> name (assignment for the solvers not listed)
+models = 'assignment'
+
+def set_models(value):
+    """ Sets models, raises ValueError for an unknown model """
+    names = value.values() if isinstance(value, dict) else [value]
+    for name in names:
+        if name not in MIP_MODELS:
+            raise ValueError("Unknown model: %s (among %s)" %
+                    (name, ', '.join(MIP_MODELS)))
+    global models
+    models = value
+
+def mip_model(solver):
+    """ Name of the model used by the MIP backend solver """
+    if isinstance(models, dict):
+        return models.get(solver, 'assignment')
+    return models
+
 def make_model(items, num_bins, capacity):
     ritems = xrange(len(items))
     rbins = xrange(num_bins)
@@ -195,6 +757,38 @@ def make_model(items, num_bins, capacity):
     return prob
 
 
+def make_arcflow_model(items, num_bins, capacity):
+    """
+    Arc-flow model (see arcflow.py): integer flows on the arcs, at most
+    num_bins units leaving the source, covering the items of each size.
+    Its size depends on the capacity and on the distinct sizes, not on
+    the number of items, and the bins are not distinguished.
+    """
+    sizes = [i.size for i in items]
+    source, nodes, arcs = arc_graph(sizes, capacity)
+    prob = LpProblem("Bin Packing Feasibility",LpMinimize)
+    prob += 0, "No objective: feasibility problem"
+    flow = [LpVariable("f%d" % a, 0, num_bins, LpInteger)
+            for a in xrange(len(arcs))]
+    ins = dict((u, []) for u in nodes)
+    outs = dict((u, []) for u in nodes)
+    items_of = {}
+    for a, (u, v, s) in enumerate(arcs):
+        outs[u].append(flow[a])
+        ins[v].append(flow[a])
+        if s:
+            items_of.setdefault(s, []).append(flow[a])
+
+    prob += lpSum(outs[source]) <= num_bins, "Bins"
+    for u in nodes:
+        if u != source and u != capacity:
+            prob += lpSum(ins[u]) == lpSum(outs[u]), "Flow at %d" % u
+    for s, count in size_counts(sizes):
+        prob += lpSum(items_of[s]) >= count, "Items of size %d" % s
+
+    return prob
+
+
 def is_trivial(items, num_bins, capacity):
     # Assumes that all items are smaller than the capacity
     """
@@ -226,12 +820,20 @@ def is_trivial(items, num_bins, capacity):
     return False, True
 
 def heuristics(items, num_bins, capacity):
+    ret, res, name = packing_heuristics(items, num_bins, capacity)
+    if name:
+        count_packer(name)
+    return ret, res
+
+def packing_heuristics(items, num_bins, capacity):
+    """ heuristics, plus the name of the packer which packed the items
+    (None if no packer was needed or none succeeded) """
     # First-Fit Increasing
     items.sort(reverse=True)
     if (len(items) <= num_bins): # defensive: verified in is_trivial
-        return True, True
+        return True, True, None
     if (items[num_bins-1].size + items[num_bins].size > capacity):
-        return True, False
+        return True, False, None
     big = 0
     half = 0
     idx = 0
@@ -246,24 +848,28 @@ def heuristics(items, num_bins, capacity):
             idx += 1
 
     if idx < num_bins:
-        return True, True
+        return True, True, None
     if 2*big + half > 2*num_bins:
-        return True, False
+        return True, False, None
 
     # BFD
     #items.sort(reverse=True)
     tmp_bins = bin_factory(num_bins, capacity)
     if first_fit(items, tmp_bins):
-        return True, True
+        return True, True, 'BFD'
 
-    # Randomized best fit
-    #for i in xrange(max(2,capacity-8)):
-    #    clean_bins(tmp_bins)
-    #    random.shuffle(items)
-    #    if first_fit(items, tmp_bins):
-    #        return True, True
+    # Other packers, randomized best fit last (see heuristic.PACKERS)
+    name = successful_packer(items, num_bins, capacity)
+    if name:
+        return True, True, name
 
-    return False, True
+    return False, True, None
+
+# Feasible instances packed by each heuristic of heuristics()
+packer_wins = {}
+def count_packer(name):
+    packer_wins[name] = packer_wins.get(name, 0) + 1
+    if stats.enabled: stats.count('packer: ' + name)
 
 
 def solve(model, solver="GLPK"):
@@ -341,6 +947,37 @@ def grb_solve(items, num_bins, capacity):
     return m.status == GRB.status.OPTIMAL
 
 
+def grb_arcflow_solve(items, num_bins, capacity):
+    """ make_arcflow_model, with Gurobi's API """
+    sizes = [i.size for i in items]
+    source, nodes, arcs = arc_graph(sizes, capacity)
+
+    m = Model("Bin Packing Feasibility")
+    flow = [m.addVar(ub=num_bins, vtype=GRB.INTEGER) for a in arcs]
+    m.update()
+
+    ins = dict((u, []) for u in nodes)
+    outs = dict((u, []) for u in nodes)
+    items_of = {}
+    for a, (u, v, s) in enumerate(arcs):
+        outs[u].append(flow[a])
+        ins[v].append(flow[a])
+        if s:
+            items_of.setdefault(s, []).append(flow[a])
+
+    m.addConstr(quicksum(outs[source]) <= num_bins)
+    for u in nodes:
+        if u != source and u != capacity:
+            m.addConstr(quicksum(ins[u]) == quicksum(outs[u]))
+    for s, count in size_counts(sizes):
+        m.addConstr(quicksum(items_of[s]) >= count)
+
+    m.setParam('OutputFlag', 0)
+    m.optimize()
+
+    return m.status == GRB.status.OPTIMAL
+
+
 def CPSolve(items, num_bins, capacity):
     ClassSolver = jpype.JClass("solver.BPSolver")
 
@@ -350,6 +987,39 @@ def CPSolve(items, num_bins, capacity):
     return bp.isFeasible()
 
 
+def flatten(instances):
+    """ Sizes of all the instances in a flat list, and the offsets of
+    each instance in it """
+    flat = []
+    offsets = [0]
+    for items in instances:
+        flat.extend(i.size for i in items)
+        offsets.append(len(flat))
+    return flat, offsets
+
+
+def unpack_bitmap(bitmap, count):
+    """ Bit (i % 8) of byte (i / 8) is set iff instance i is feasible """
+    bitmap = bytearray(bitmap)
+    return [bool(bitmap[i/8] >> (i%8) & 1) for i in xrange(count)]
+
+
+def CPSolve_batch(instances, num_bins, capacity):
+    global batch_endpoint
+    ClassSolver = jpype.JClass("solver.BPSolver")
+    if not hasattr(ClassSolver, 'isFeasibleBatch'):
+        # solver.jar built before the batch endpoint
+        batch_endpoint = False
+        return [CPSolve(items, num_bins, capacity) for items in instances]
+    JIntArray = jpype.JArray(jpype.JInt)
+
+    flat, offsets = flatten(instances)
+    bitmap = ClassSolver.isFeasibleBatch(JIntArray(flat), JIntArray(offsets),
+            num_bins, capacity)
+
+    return unpack_bitmap([b & 0xFF for b in bitmap], len(instances))
+
+
 def run_jvm(jvmpath, jarpath):
 
     classpath = ''
@@ -366,21 +1036,43 @@ def close_jvm():
     jpype.shutdownJVM()
 
 
-gateway = None
-def py4j_run():
-    global gateway
-    gateway = JavaGateway()
-
+solver_pool = None
 def py4j_solve(items, num_bins, capacity):
-    global gateway
-    if not gateway: py4j_run()
+    return py4j_solve_batch([items], num_bins, capacity)[0]
 
-    int_class = gateway.jvm.int
-    jitems = gateway.new_array(int_class,len(items))
+def py4j_solve_batch(instances, num_bins, capacity):
+    """
+    Single round trip: the instances are sent as one byte array of
+    big-endian ints (count, offsets, items), see BPSolver.isFeasibleBatch
+    """
+    global batch_endpoint
+    if batch_endpoint:
+        from py4j.protocol import Py4JError, Py4JNetworkError
+        flat, offsets = flatten(instances)
+        ints = [len(instances)] + offsets + flat
+        buf = bytearray(struct.pack('>%di' % len(ints), *ints))
+        try:
+            bitmap = solver_pool.call(lambda gateway:
+                gateway.entry_point.isFeasibleBatch(buf, num_bins, capacity))
+            return unpack_bitmap(bitmap, len(instances))
+        except Py4JNetworkError:
+            raise
+        except Py4JError as e:
+            # solver.jar built before the batch endpoint
+            if 'does not exist' not in str(e):
+                raise
+            batch_endpoint = False
+    return [solver_pool.call(lambda gateway:
+                py4j_solve_one(gateway, items, num_bins, capacity))
+            for items in instances]
+
+def py4j_solve_one(gateway, items, num_bins, capacity):
+    """ One instance, with the solver of the entry point """
+    jitems = gateway.new_array(gateway.jvm.int, len(items))
     for i, it in enumerate(items):
         jitems[i] = it.size
 
-    solver = stack = gateway.entry_point.getSolver()
+    solver = gateway.entry_point.getSolver()
     solver.reset(jitems, num_bins, capacity)
 
     return solver.isFeasible()
@@ -0,0 +1,137 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+"""
+Certificates of the lower bounds found by upper_bounding.py.
+
+A certificate is the strategy of the adversary forcing any online
+algorithm to load a bin up to `target`, while the items played can
+always be packed offline into the bins. It is a text file: a header,
+then one line per node of the strategy tree, in preorder.
+
+    bin-stretching-certificate 1
+    bins 3
+    capacity 14
+    target 19
+    weights 14 13 ... 1
+    W 5         the adversary plays an item of weight 5; one subtree
+                follows for each distinct bin load, by decreasing
+                order of the loads before the item is packed
+    S           a bin load reaches target
+    R 12        same state as the 13th W line: its subtree holds here
+
+verify.py checks a certificate independently of the search.
+"""
+
+MAGIC = "bin-stretching-certificate 1"
+
+
+def write_header(f, num_bins, capacity, target, weights):
+    f.write(MAGIC + "\n")
+    f.write("bins %d\n" % num_bins)
+    f.write("capacity %d\n" % capacity)
+    f.write("target %d\n" % target)
+    f.write("weights %s\n" % " ".join(str(w) for w in weights))
+
+
+def write(f, state, rem_cap, weights, target, largest, wins):
+    """
+    Writes the strategy of the adversary forcing target from state.
+    Returns the number of W lines.
+
+    weights -- the allowed weights, by decreasing order
+    largest -- largest(state): largest feasible next weight
+    wins -- wins(state, rem_cap): True iff the adversary can force
+        target from state
+    """
+    write_header(f, len(state.loads), state.capacity, target, weights)
+    ids = {}
+
+    def node(rem_cap):
+        loads = state.loads
+        if loads[0] >= target:
+            f.write("S\n")
+            return
+        key = (tuple(loads), tuple(state.counts))
+        if key in ids:
+            f.write("R %d\n" % ids[key])
+            return
+        w = winning_move(rem_cap)
+        ids[key] = len(ids)
+        f.write("W %d\n" % w)
+        prev = -1
+        for i in xrange(len(loads)):
+            if loads[i] == prev: continue
+            prev = loads[i]
+            j = state.apply(w, i)
+            node(rem_cap-w)
+            state.undo(w, j)
+
+    def winning_move(rem_cap):
+        loads = state.loads
+        wmax = largest(state)
+        for w in weights:
+            if w > wmax: continue
+            ok = True
+            prev = -1
+            for i in xrange(len(loads)):
+                if loads[i] == prev: continue
+                prev = loads[i]
+                j = state.apply(w, i)
+                ok = loads[0] >= target or wins(state, rem_cap-w)
+                state.undo(w, j)
+                if not ok: break
+            if ok:
+                return w
+        raise ValueError("The adversary cannot force %d from loads %s"
+                % (target, loads))
+
+    node(rem_cap)
+    return len(ids)
+
+
+def read_header(f):
+    """ Returns (num_bins, capacity, target, weights) """
+    if f.readline().strip() != MAGIC:
+        raise ValueError("Not a certificate")
+    fields = {}
+    for name in ("bins", "capacity", "target", "weights"):
+        line = f.readline().split()
+        if not line or line[0] != name:
+            raise ValueError("Missing header line: %s" % name)
+        fields[name] = [int(x) for x in line[1:]]
+    return (fields["bins"][0], fields["capacity"][0], fields["target"][0],
+            fields["weights"])
@@ -0,0 +1,84 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+"""
+Checkpoints of the sequential adversary search (see upper_bounding.run).
+
+A checkpoint holds the transposition table, the feasibility results of
+bpsolver, the counters of the search and the DFS position: one frame per
+branch() on the path from the root to the node being explored, with the
+orders of the moves, the weight and bin of the son in progress and the
+bounds already obtained.
+
+The search saves a checkpoint by raising Checkpoint: each branch() adds
+its frame while the exception goes up to run(), which writes the file
+and resumes the search from it. Resuming after a restart is the same
+operation, from the file.
+"""
+
+import os
+import cPickle as pickle
+
+VERSION = 2
+
+
+class Checkpoint(Exception):
+    """ Unwinds the search; frames are appended from the deepest one """
+    def __init__(self):
+        Exception.__init__(self, "checkpoint")
+        self.frames = []
+
+
+def save(path, data):
+    """ Writes data atomically: a crash while saving keeps the former
+    checkpoint """
+    data = dict(data, version=VERSION)
+    tmp = path + '.tmp'
+    f = open(tmp, 'wb')
+    pickle.dump(data, f, pickle.HIGHEST_PROTOCOL)
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+    os.rename(tmp, path)
+
+
+def load(path):
+    f = open(path, 'rb')
+    data = pickle.load(f)
+    f.close()
+    if data.get('version') != VERSION:
+        raise ValueError("%s: unsupported checkpoint version" % path)
+    return data
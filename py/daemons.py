@@ -0,0 +1,375 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+"""
+Pool of persistent solver daemons (Py4J gateways of solver.jar).
+
+Each daemon is a `java -jar solver.jar PORT` process. A daemon is ready
+once it has written its start line and answered a ping through Py4J.
+Queries are spread round-robin over the daemons, and a daemon which died
+is restarted. Ports and pids are kept in a state file: the workers of a
+parallel run, or a later run, attach to the running daemons instead of
+paying the JVM startup again. Runs starting daemons at the same time
+take turns through a lock on the state file, and ports used by other
+processes are skipped.
+
+Daemons started from the command line stay up between runs:
+
+    python daemons.py start -k 4
+    python daemons.py status
+    python daemons.py stop
+"""
+
+import os
+import sys
+import json
+import time
+import fcntl
+import signal
+import socket
+import argparse
+import contextlib
+import subprocess
+import threading
+
+from py4j.java_gateway import JavaGateway, GatewayClient
+from py4j.protocol import Py4JError, Py4JNetworkError
+
+READY_LINE = "Gateway Server Started"
+# Ports tried beyond the size of a pool when some are taken
+SPARE_PORTS = 64
+
+
+def port_free(port):
+    """ Whether no process listens on the local port """
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind(('127.0.0.1', port))
+        return True
+    except socket.error:
+        return False
+    finally:
+        s.close()
+
+
+class Daemon:
+    """ One gateway process, started by this pool or attached to """
+    def __init__(self, port, pid, persistent=False):
+        self.port = port
+        self.pid = pid
+        self.persistent = persistent
+        self.proc = None
+        self.gateway = None
+        self.gateway_pid = None
+
+    def alive(self):
+        if self.proc is not None:
+            return self.proc.poll() is None
+        try:
+            os.kill(self.pid, 0)
+        except OSError:
+            return False
+        return True
+
+    def connect(self):
+        # Py4J connections cannot be shared between forked processes
+        if self.gateway is None or self.gateway_pid != os.getpid():
+            self.gateway = JavaGateway(GatewayClient(port=self.port))
+            self.gateway_pid = os.getpid()
+        return self.gateway
+
+    def disconnect(self):
+        if self.gateway is not None and self.gateway_pid == os.getpid():
+            try:
+                self.gateway.close()
+            except Py4JError:
+                pass
+        self.gateway = None
+
+    def ping(self):
+        try:
+            entry = self.connect().entry_point
+            try:
+                return entry.ping() == "pong"
+            except Py4JNetworkError:
+                raise
+            except Py4JError:
+                # solver.jar built before ping(): any answer will do
+                return entry.getSolver() is not None
+        except Py4JError:
+            self.disconnect()
+            return False
+
+    def kill(self):
+        self.disconnect()
+        try:
+            os.kill(self.pid, signal.SIGTERM)
+        except OSError:
+            pass
+        if self.proc is not None:
+            self.proc.wait()
+
+    def as_dict(self):
+        return {'port': self.port, 'pid': self.pid,
+                'persistent': self.persistent}
+
+
+class SolverPool:
+    """
+    size daemons on ports base_port, base_port+1, ...
+    state_file -- JSON file listing the running daemons (None: no reuse)
+    owner -- only an owner starts and restarts daemons; the others (the
+        workers of a parallel run) attach to the ones of the state file
+    """
+    def __init__(self, jar, size=1, base_port=25333, state_file=None,
+            owner=True, timeout=60.):
+        self.jar = jar
+        self.size = size
+        self.base_port = base_port
+        self.state_file = state_file
+        self.owner = owner
+        self.timeout = timeout
+        self.daemons = []
+        self.next = 0
+        self.restarts = 0
+        self.queries = 0
+        # Calls may come from the prefetch threads (see prefetch.py)
+        self.lock = threading.RLock()
+
+    def start(self, persistent=False):
+        """ Attach to the daemons of the state file which answer a ping,
+        and start the missing ones on free ports """
+        with self.state_lock():
+            known = dict((d.port, d) for d in self.read_state())
+            self.daemons = []
+            port = self.base_port
+            while len(self.daemons) < self.size:
+                if port >= self.base_port + self.size + SPARE_PORTS:
+                    raise RuntimeError("No free port for the solver daemons"
+                            " from %d" % self.base_port)
+                d = known.get(port)
+                if d is not None and d.alive() and d.ping():
+                    self.daemons.append(d)
+                elif port_free(port):
+                    self.daemons.append(self.spawn(port, persistent))
+                port += 1
+            self.write_state()
+        return self
+
+    def attach(self):
+        """ Use the daemons of the state file, without starting any """
+        self.daemons = [d for d in self.read_state() if d.alive()]
+        if not self.daemons:
+            raise RuntimeError("No solver daemon running (state file: %s)"
+                    % self.state_file)
+        return self
+
+    def spawn(self, port, persistent=False):
+        """ Start a gateway on port and wait until it is ready """
+        log = self.log_path(port)
+        out = open(log, 'w')
+        args = ['java', '-jar', self.jar, str(port)]
+        # A new session: persistent daemons do not get the signals of
+        # the terminal of this run
+        proc = subprocess.Popen(args, stdout=out, stderr=subprocess.STDOUT,
+                preexec_fn=os.setsid)
+        out.close()
+        d = Daemon(port, proc.pid, persistent)
+        d.proc = proc
+        self.wait_ready(d, log)
+        return d
+
+    def wait_ready(self, d, log):
+        """ Wait for the start line of the daemon, then for a ping """
+        deadline = time.time() + self.timeout
+        started = False
+        while time.time() < deadline:
+            if not d.alive():
+                raise RuntimeError("Solver daemon on port %d exited, see %s"
+                        % (d.port, log))
+            if not started:
+                with open(log) as f:
+                    started = READY_LINE in f.read()
+            if started and d.ping():
+                return
+            time.sleep(0.05)
+        d.kill()
+        raise RuntimeError("Solver daemon on port %d not ready after %ds"
+                % (d.port, self.timeout))
+
+    def restart(self, d):
+        self.restarts += 1
+        d.kill()
+        n = self.daemons.index(d)
+        with self.state_lock():
+            port = d.port
+            while not port_free(port):
+                port += 1
+                if port >= d.port + SPARE_PORTS:
+                    raise RuntimeError("No free port for the solver daemons"
+                            " from %d" % d.port)
+            self.daemons[n] = self.spawn(port, d.persistent)
+            self.write_state([d.port])
+        return self.daemons[n]
+
+    def call(self, f):
+        """
+        f(gateway) on the next daemon. A daemon which does not answer is
+        restarted (by an owner) or skipped, and f is run again.
+        """
+        with self.lock:
+            if not self.daemons:
+                self.attach()
+            self.queries += 1
+        for attempt in xrange(len(self.daemons) + 1):
+            with self.lock:
+                d = self.daemons[self.next % len(self.daemons)]
+                self.next += 1
+                if not d.alive():
+                    if not self.owner: continue
+                    d = self.restart(d)
+                gateway = d.connect()
+            try:
+                return f(gateway)
+            except Py4JNetworkError:
+                with self.lock:
+                    d.disconnect()
+                    # Unless another thread restarted it
+                    if self.owner and d in self.daemons and not d.ping():
+                        self.restart(d)
+        raise RuntimeError("No solver daemon answers")
+
+    def stop(self, all=False):
+        """ Kill the daemons started by this pool, except the persistent
+        ones. all: kill every known daemon """
+        if not self.owner: return
+        kept = []
+        killed = []
+        for d in self.daemons:
+            if all or (d.proc is not None and not d.persistent):
+                d.kill()
+                killed.append(d.port)
+            else:
+                d.disconnect()
+                kept.append(d)
+        self.daemons = kept
+        with self.state_lock():
+            self.write_state(killed)
+
+    def status(self):
+        """ (port, pid, persistent, answers a ping) of the known daemons """
+        return [(d.port, d.pid, d.persistent, d.alive() and d.ping())
+                for d in self.read_state()]
+
+    def stats(self):
+        return {'daemons': len(self.daemons), 'queries': self.queries,
+                'restarts': self.restarts}
+
+    def log_path(self, port):
+        if self.state_file:
+            return "%s.%d.log" % (os.path.splitext(self.state_file)[0], port)
+        return os.path.join(os.environ.get('TMPDIR', '/tmp'),
+                'solver-daemon.%d.log' % port)
+
+    @contextlib.contextmanager
+    def state_lock(self):
+        """ Exclusive lock of the state file, held by the pools of all
+        the processes while they read, start and write daemons """
+        if not self.state_file:
+            yield
+            return
+        f = open(self.state_file + '.lock', 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+
+    def read_state(self):
+        if not self.state_file or not os.path.exists(self.state_file):
+            return []
+        with open(self.state_file) as f:
+            return [Daemon(e['port'], e['pid'], e['persistent'])
+                    for e in json.load(f)]
+
+    def write_state(self, removed=()):
+        """ Merge the daemons of this pool into the state file: the
+        running daemons of other pools are kept, those on the ports
+        removed are dropped. Called with state_lock held """
+        if not self.state_file: return
+        ports = set(removed) | set(d.port for d in self.daemons)
+        daemons = [d for d in self.read_state()
+                if d.port not in ports and d.alive()] + self.daemons
+        if not daemons:
+            if os.path.exists(self.state_file):
+                os.remove(self.state_file)
+            return
+        tmp = "%s.%d.tmp" % (self.state_file, os.getpid())
+        with open(tmp, 'w') as f:
+            json.dump([d.as_dict() for d in daemons], f)
+        os.rename(tmp, self.state_file)
+
+
+def main():
+    p = argparse.ArgumentParser(description='Manages the persistent solver\
+            daemons used by solver CHOCO4J')
+    p.add_argument('command', choices=['start', 'stop', 'status'])
+    p.add_argument('-k', type=int, default=None,
+            help='number of daemons (default: daemons in config.conf)')
+    args = p.parse_args()
+
+    import yaml
+    dirn = os.path.abspath(os.path.dirname(sys.argv[0]))
+    stream = file(dirn + '/config.conf')
+    conf = yaml.load(stream)
+    stream.close()
+    jar = os.path.join(dirn, conf.get('jarpath', '../lib/'), 'solver.jar')
+    state_file = os.path.join(dirn, conf.get('daemon-file', 'daemons.json'))
+    k = args.k or conf.get('daemons', 1)
+
+    pool = SolverPool(jar, k, state_file=state_file)
+    if args.command == 'start':
+        pool.start(persistent=True)
+    elif args.command == 'stop':
+        pool.daemons = pool.read_state()
+        pool.stop(all=True)
+    for port, pid, persistent, up in pool.status():
+        print "port %d\tpid %d\t%s" % (port, pid, "up" if up else "down")
+
+if __name__ == "__main__":
+    main()
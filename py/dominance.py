@@ -0,0 +1,237 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+"""
+Dominance between states of the adversary search.
+
+Two states with the same bin loads differ only by their items. If the
+items of a state S refine those of a state E (the items of E are sums of
+disjoint groups of items of S), every item sequence the adversary can
+play from E can also be played from S: any packing for E splits into a
+packing for S. The algorithm sees the same loads, so the value of S is
+at least the value of E:
+    lower bound of E  ->  lower bound of S
+    upper bound of S  ->  upper bound of E
+
+The index keeps, per load vector, a few solved states with their bounds.
+A lookup is a dictionary access plus a scan of these few states.
+"""
+
+from operator import sub
+
+from bins import HASH_MASK, CHECK_MASK
+from ttable import INFINITY
+from state import GameState
+
+
+class DominanceIndex:
+    """
+    Hash of the loads -> [[check of the loads, number of items,
+                          item counts, lower, upper, work], ...]
+    """
+    def __init__(self, max_states=2**18, per_loads=4):
+        self.max_states = max_states
+        self.per_loads = per_loads
+        self.buckets = {}
+        self.size = 0
+        self.lookups = 0
+        self.found = 0
+        self.cuts = 0
+        self.saved = 0
+        self.stores = 0
+        self.resets = 0
+
+    def store(self, state, lower_bound, upper_bound, val, work):
+        """
+        Records the value val of the GameState state, returned by a search within
+        ]lower_bound, upper_bound[ which explored work nodes (see
+        TranspositionTable.store)
+        """
+        if lower_bound >= upper_bound:
+            return
+        if val <= lower_bound:
+            lower, upper = -INFINITY, val
+        elif val >= upper_bound:
+            lower, upper = val, INFINITY
+        else:
+            lower = upper = val
+        self.stores += 1
+        key = (state.hash - state.items_hash) & HASH_MASK
+        check = (state.check - state.items_check) & CHECK_MASK
+        b = self.buckets.get(key)
+        if b is None:
+            if self.size >= self.max_states:
+                # Starts again rather than tracking the oldest states
+                self.buckets = {}
+                self.size = 0
+                self.resets += 1
+            b = self.buckets[key] = []
+        counts = state.counts
+        for e in b:
+            if e[0] == check and e[2] == counts:
+                e[3] = max(e[3], lower)
+                e[4] = min(e[4], upper)
+                e[5] += work
+                return
+        if len(b) >= self.per_loads:
+            del b[0]
+        else:
+            self.size += 1
+        b.append([check, state.num_items, counts[:], lower, upper, work])
+
+    def lookup(self, state, lower_bound, upper_bound):
+        """
+        Bounds (lower, upper, work) on the value of the GameState implied by
+        the dominated and dominating states, or None. Only the bounds which
+        narrow ]lower_bound, upper_bound[ are looked for. work is the size
+        of the subtrees which gave the bounds.
+        """
+        b = self.buckets.get((state.hash - state.items_hash) & HASH_MASK)
+        if not b:
+            return None
+        self.lookups += 1
+        check = (state.check - state.items_check) & CHECK_MASK
+        num_items = state.num_items
+        counts = state.counts
+        lower = lower_bound
+        upper = upper_bound
+        work = 0
+        for ch, k, c, lo, up, n in b:
+            if ch != check:
+                continue
+            # The refinement has more items: the direction is known before
+            # comparing the items, and most entries can be skipped
+            if k < num_items:
+                if lo > lower and refinement(counts, c):
+                    lower = lo
+                    work = max(work, n)
+            elif k > num_items:
+                if up < upper and refinement(c, counts):
+                    upper = up
+                    work = max(work, n)
+        if not work:
+            return None
+        self.found += 1
+        return lower, upper, work
+
+    def cut(self, work):
+        """ A lookup pruned a node: work estimates the nodes saved """
+        self.cuts += 1
+        self.saved += work
+
+    def stats(self):
+        return {'states': self.size, 'lookups': self.lookups,
+                'found': self.found, 'cuts': self.cuts,
+                'nodes saved (est.)': self.saved, 'stores': self.stores,
+                'resets': self.resets}
+
+
+def refinement(fine, coarse):
+    """
+    True if the items given by their counts per weight fine refine those
+    given by coarse, both having the same total. Only the items which
+    differ are considered: a merge of any items into one, or a split of
+    two items, is recognised.
+    """
+    d = map(sub, fine, coarse)
+    more = 0
+    less = 0
+    for x in filter(None, d):
+        if x > 0: more += x
+        else: less -= x
+    if less == 1:
+        # The fine items merge into the coarse one
+        return True
+    if less != 2 or more > 8:
+        return False
+    ef = []
+    ec = []
+    for w, x in enumerate(d):
+        if x > 0:
+            ef.extend([w]*x)
+        elif x < 0:
+            ec.extend([w]*-x)
+    return refines(ef, ec)
+
+
+def refines(fine, coarse):
+    """ True if the items fine can be grouped into the items coarse,
+    both having the same total """
+    if len(coarse) == 1:
+        return True
+    if len(coarse) == 2 and len(fine) <= 8:
+        # A subset of fine sums to coarse[0]; the others to coarse[1]
+        target = coarse[0]
+        sums = 1
+        mask = (1 << (target+1)) - 1
+        for w in fine:
+            sums = (sums | (sums << w)) & mask
+        return bool(sums >> target & 1)
+    return False
+
+
+def main():
+    assert refinement([0, 2, 0, 1], [0, 0, 1, 1])         # 1+1 = 2
+    assert not refinement([0, 0, 1, 1], [0, 2, 0, 1])
+    assert refinement([0, 1, 1, 0, 0], [0, 0, 0, 1, 0])
+    assert not refinement([0, 0, 2, 0], [0, 1, 0, 1])     # same size
+    assert refinement([0, 3, 0, 0, 1], [0, 0, 0, 1, 1])   # 1+1+1 = 3
+    assert not refinement([0, 1, 0, 0, 1], [0, 0, 1, 1, 0])   # 1+4, 2+3
+    assert refines([1, 2, 3], [3, 3]) and not refines([2, 2, 2], [1, 5])
+    def state(loads, items):
+        # A state with the given loads whatever the items
+        s = GameState(len(loads), 10, 4)
+        for i, u in enumerate(loads):
+            if u: s.apply(u, i)
+        for u in loads:
+            if u: s.counts[u] -= 1
+        for w in items:
+            s.counts[w] += 1
+        s.num_items = len(items)
+        s.items_hash = s.items_check = 0
+        return s
+    d = DominanceIndex()
+    d.store(state([3, 0], [1, 2]), 1, 6, 3, 10)         # items 1, 2: 3
+    d.store(state([3, 0], [1, 1, 1]), 4, 6, 4, 7)       # items 1, 1, 1: <= 4
+    assert d.lookup(state([3, 0], [3]), 0, 6) == (0, 3, 10)
+    assert d.lookup(state([3, 0], [1, 2]), 0, 6) == (0, 4, 7)
+    assert d.lookup(state([3, 0], [1, 2]), 0, 4) is None
+    assert d.lookup(state([3, 0], [1, 1, 1]), 0, 6) == (3, 6, 10)
+    assert d.lookup(state([2, 1], [3]), 0, 6) is None
+    print "Dummy tests passed"
+
+if __name__ == "__main__":
+    main()
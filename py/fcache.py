@@ -0,0 +1,136 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+
+"""
+Persistent feasibility cache, shared across runs and processes.
+
+Exact bin packing results are stored in an SQLite database so that a new
+run (or a concurrent one on the same machine) does not solve the same
+instance twice. The database is opened in WAL mode: readers never block
+and concurrent writers wait on a lock for at most `timeout` seconds.
+"""
+
+import os
+import sqlite3
+
+
+class FeasibilityCache:
+    """ (item multiset, num_bins, capacity) -> bool, stored on disk """
+    def __init__(self, path, flush_every=256, timeout=60.):
+        self.path = path
+        self.flush_every = flush_every
+        self.timeout = timeout
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.pending = []
+        self.conn = None
+        self.connect()
+
+    def connect(self):
+        # Connections cannot be shared between forked processes
+        self.pid = os.getpid()
+        self.pending = []
+        self.conn = sqlite3.connect(self.path, timeout=self.timeout)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS feasibility "
+                "(key TEXT PRIMARY KEY, feasible INTEGER NOT NULL)")
+        self.conn.commit()
+
+    def check_process(self):
+        if self.pid != os.getpid():
+            self.connect()
+
+    def get(self, key):
+        """ Return the stored result or None """
+        self.check_process()
+        row = self.conn.execute(
+                "SELECT feasible FROM feasibility WHERE key = ?",
+                (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return bool(row[0])
+
+    def put(self, key, feasible):
+        self.check_process()
+        self.pending.append((key, int(feasible)))
+        if len(self.pending) >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """ Write buffered results in a single transaction """
+        if not self.pending or self.pid != os.getpid():
+            return
+        self.conn.executemany(
+                "INSERT OR REPLACE INTO feasibility VALUES (?, ?)",
+                self.pending)
+        self.conn.commit()
+        self.writes += len(self.pending)
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        rate = float(self.hits)/lookups if lookups else 0.
+        return {'hits': self.hits, 'misses': self.misses,
+                'writes': self.writes, 'hit rate': rate}
+
+
+def main():
+    import tempfile
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    c = FeasibilityCache(path, flush_every=2)
+    assert c.get("1 3 2 2") is None
+    c.put("1 3 2 2", True)
+    c.put("3 2 2 2", False)
+    d = FeasibilityCache(path)
+    assert d.get("1 3 2 2")
+    assert d.get("3 2 2 2") is False
+    c.close()
+    d.close()
+    os.remove(path)
+    print "Dummy tests passed"
+
+if __name__ == "__main__":
+    main()
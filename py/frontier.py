@@ -0,0 +1,191 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+
+"""
+Monotone index of bin packing results.
+
+With given bins, if a multiset of items is infeasible, so is every
+multiset containing it; if it is feasible, so is every multiset it
+contains. The search queries chains of nested multisets, which exact
+keys (bpsolver.mem) do not relate.
+
+A multiset is a vector of counts per weight, largest weight first. The
+index keeps the minimal infeasible vectors and the maximal feasible
+ones, in tries with one level per weight: a query only walks the
+branches whose counts are below (or above) its own.
+"""
+
+
+class CountTrie:
+    """ Set of count vectors of same length, as nested dicts """
+    def __init__(self):
+        self.root = {}
+        self.size = 0
+
+    def insert(self, v):
+        node = self.root
+        for c in v:
+            node = node.setdefault(c, {})
+        self.size += 1
+
+    def remove(self, v):
+        path = []
+        node = self.root
+        for c in v:
+            path.append((node, c))
+            node = node[c]
+        # Drops the branches left empty
+        for node, c in reversed(path):
+            if node[c]:
+                break
+            del node[c]
+        self.size -= 1
+
+    def below(self, v, first=False):
+        """ The vectors u <= v (all their counts), only one if first """
+        return self.search(v, lambda c, x: c <= x, first)
+
+    def above(self, v, first=False):
+        """ The vectors u >= v, only one if first """
+        return self.search(v, lambda c, x: c >= x, first)
+
+    def search(self, v, keep, first):
+        found = []
+        n = len(v)
+        stack = [(self.root, 0, ())]
+        while stack:
+            node, d, u = stack.pop()
+            if d == n:
+                found.append(u)
+                if first:
+                    break
+                continue
+            x = v[d]
+            for c, child in node.iteritems():
+                if keep(c, x):
+                    stack.append((child, d+1, u + (c,)))
+        return found
+
+
+class Frontier:
+    """
+    Minimal infeasible and maximal feasible count vectors, for bins of
+    given number and capacity. Both sets are emptied when their total
+    size reaches max_size.
+    """
+    def __init__(self, max_size=2**16):
+        self.max_size = max_size
+        self.infeasible = CountTrie()
+        self.feasible = CountTrie()
+        self.hits = 0
+        self.misses = 0
+        self.resets = 0
+
+    def lookup(self, v):
+        """ Result implied by the known vectors, None if unknown """
+        if self.infeasible.size and self.infeasible.below(v, True):
+            self.hits += 1
+            return False
+        if self.feasible.size and self.feasible.above(v, True):
+            self.hits += 1
+            return True
+        self.misses += 1
+        return None
+
+    def store(self, v, sol):
+        if self.infeasible.size + self.feasible.size >= self.max_size:
+            self.infeasible = CountTrie()
+            self.feasible = CountTrie()
+            self.resets += 1
+        if sol:
+            known, implied = self.feasible.above, self.feasible.below
+            trie = self.feasible
+        else:
+            known, implied = self.infeasible.below, self.infeasible.above
+            trie = self.infeasible
+        if known(v, True):
+            return
+        for u in implied(v):
+            trie.remove(u)
+        trie.insert(v)
+
+    def stats(self):
+        n = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit rate': float(self.hits)/n if n else 0.,
+                'infeasible': self.infeasible.size,
+                'feasible': self.feasible.size, 'resets': self.resets}
+
+
+def count_vector(items, capacity):
+    """ Counts of items per weight, from capacity down to 1 """
+    counts = [0]*(capacity+1)
+    for i in items:
+        counts[i.size] += 1
+    counts.reverse()
+    return tuple(counts[:-1])
+
+
+def main():
+    t = CountTrie()
+    for v in [(1, 0, 2), (0, 1, 1), (1, 1, 0)]:
+        t.insert(v)
+    assert sorted(t.below((1, 1, 2))) == [(0, 1, 1), (1, 0, 2), (1, 1, 0)]
+    assert t.below((0, 2, 1)) == [(0, 1, 1)]
+    assert t.above((1, 0, 1)) == [(1, 0, 2)]
+    t.remove((1, 0, 2))
+    assert t.above((1, 0, 1)) == [] and t.size == 2
+    assert t.root[1].keys() == [1]
+
+    f = Frontier()
+    f.store((0, 2, 1), False)
+    f.store((0, 2, 2), False)           # implied: not kept
+    f.store((0, 1, 1), True)
+    f.store((0, 1, 0), True)            # implied: not kept
+    assert f.infeasible.size == 1 and f.feasible.size == 1
+    assert f.lookup((1, 2, 1)) is False
+    assert f.lookup((0, 0, 1)) is True
+    assert f.lookup((0, 1, 2)) is None
+    f.store((0, 1, 2), True)            # (0, 1, 1) is no longer maximal
+    assert f.feasible.size == 1 and f.lookup((0, 1, 1)) is True
+    f.store((0, 1, 3), False)
+    f.store((0, 0, 3), False)           # (0, 1, 3) is no longer minimal
+    assert f.infeasible.size == 2
+    print "Dummy tests passed"
+
+if __name__ == "__main__":
+    main()
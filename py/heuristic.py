@@ -37,7 +37,10 @@
 
 from bins import *
 from math import ceil
+from bisect import bisect_left, insort
+from heapq import heapify, heappush, heappop
 import itertools
+import random
 
 
 def first_fit(items, bins):
@@ -46,18 +49,17 @@ def first_fit(items, bins):
         place an item in the bin with the
         smallest remaining space possible
 
-    Bins might be empty or not
+    Bins might be empty or not. They are kept sorted by remaining space,
+    so that each item is placed after a binary search.
     """
-
+    rem = sorted((b.remaining, k) for k, b in enumerate(bins))
     for i in items:
-        bins.sort(key=lambda x: x.remaining, reverse=False)
-        added = False
-        for b in bins:
-            if b.add(i):
-                added = True
-                break
-        if not added:
+        j = bisect_left(rem, (i.size, -1))
+        if j == len(rem):
             return False
+        r, k = rem.pop(j)
+        bins[k].force_add(i)
+        insort(rem, (r - i.size, k))
 
     return True
 
@@ -138,3 +140,315 @@ def compute_min_bins(items, capacity):
 
 
     return int(L2)
+
+
+################## Lower bounds ####################
+
+# The bounds below take the item sizes, sorted by decreasing order, and
+# give a lower bound on the number of bins needed to pack them. They are
+# tried in this order before the exact solver: an instance needing more
+# bins than available is infeasible.
+
+def ceil_div(a, b):
+    return -(-a // b)
+
+def l2_bound(sizes, capacity):
+    """
+    Bound L2 of Martello and Toth, for every parameter k <= capacity/2:
+    items larger than capacity-k need a bin each, items larger than
+    capacity/2 a bin each, and the items in [k, capacity/2] fill the
+    free space of the latter before needing new bins.
+    """
+    best = ceil_div(sum(sizes), capacity)
+    ks = set(s for s in sizes if 2*s <= capacity)
+    ks.add(0)
+    for k in ks:
+        n1 = n2 = s2 = s3 = 0
+        for s in sizes:
+            if s > capacity - k: n1 += 1
+            elif 2*s > capacity:
+                n2 += 1
+                s2 += s
+            elif s >= k: s3 += s
+        free = n2*capacity - s2
+        best = max(best, n1 + n2 + max(0, ceil_div(s3 - free, capacity)))
+    return best
+
+def dff_bound(sizes, capacity, max_k=5):
+    """
+    Bounds given by the dual feasible functions of Fekete and Schepers:
+    u_k (k <= max_k) composed with U_l, which rounds items larger than
+    capacity-l up to capacity and drops the items smaller than l.
+    Scaled by k*capacity to stay integer: u_k(x) = k*x if (k+1)*x is a
+    multiple of capacity, floor((k+1)*x/capacity)*capacity otherwise.
+    """
+    best = 0
+    ls = set(s for s in sizes if 2*s <= capacity)
+    ls.add(0)
+    for l in ls:
+        u = [capacity if s > capacity - l else s for s in sizes if s >= l]
+        for k in xrange(1, max_k+1):
+            total = 0
+            for x in u:
+                y = (k+1)*x
+                if y % capacity: total += (y // capacity)*capacity
+                else: total += k*x
+            best = max(best, ceil_div(total, k*capacity))
+    return best
+
+def mtrp_bound(sizes, capacity):
+    """
+    Martello-Toth reduction procedure, then L2 on the remaining items.
+    The largest item i is packed with the largest item j which fits with
+    it whenever no set of other items fitting with i is larger than j:
+    any bin holding i is then dominated by the bin {i, j}.
+    """
+    rest = list(sizes)
+    fixed = 0
+    i = 0
+    while i < len(rest):
+        r = capacity - rest[i]
+        fitting = [x for x in rest[:i] + rest[i+1:] if x <= r]
+        if fitting:
+            # Best total of other items which fit with i
+            sums = 1
+            mask = (1 << (r+1)) - 1
+            for x in fitting:
+                sums = (sums | (sums << x)) & mask
+            if sums.bit_length() - 1 != fitting[0]:
+                i += 1
+                continue
+            del rest[i]
+            rest.remove(fitting[0])
+        else:
+            del rest[i]
+        fixed += 1
+    return fixed + l2_bound(rest, capacity)
+
+BOUNDS = (('L2', l2_bound), ('DFF', dff_bound), ('MTRP', mtrp_bound))
+
+def exceeding_bound(items, num_bins, capacity):
+    """
+    Name of the first bound of BOUNDS proving that items do not fit into
+    num_bins bins, None if none does. items is sorted by decreasing order.
+    """
+    sizes = [i.size for i in items]
+    for name, bound in BOUNDS:
+        if bound(sizes, capacity) > num_bins:
+            return name
+    return None
+
+
+################## Packing portfolio ####################
+
+# Packers tried when first_fit fails, cheapest first. They take the item
+# sizes sorted by decreasing order, and return True if they find a
+# packing into num_bins bins. Each one has a fixed budget.
+
+def best_fit(sizes, num_bins, capacity):
+    """ Each item in the bin with the least remaining space it fits in """
+    rem = [capacity]*num_bins
+    for s in sizes:
+        j = bisect_left(rem, s)
+        if j == num_bins:
+            return False
+        r = rem.pop(j)
+        insort(rem, r - s)
+    return True
+
+def first_fit_decreasing(sizes, num_bins, capacity):
+    """ Each item in the first bin it fits in """
+    loads = [0]*num_bins
+    for s in sizes:
+        for k in xrange(num_bins):
+            if loads[k] + s <= capacity:
+                loads[k] += s
+                break
+        else:
+            return False
+    return True
+
+def worst_fit_decreasing(sizes, num_bins, capacity):
+    """ Each item in the least loaded bin: balances the loads """
+    loads = [0]*num_bins
+    for s in sizes:
+        u = heappop(loads)
+        if u + s > capacity:
+            return False
+        heappush(loads, u + s)
+    return True
+
+def karmarkar_karp(sizes, num_bins, capacity):
+    """
+    Largest differencing method for num_bins subsets: the two partial
+    partitions of largest spread are merged, the largest subset of one
+    with the smallest of the other.
+    """
+    if not sizes:
+        return True
+    heap = [(-s, [s] + [0]*(num_bins-1)) for s in sizes]
+    heapify(heap)
+    while len(heap) > 1:
+        a = heappop(heap)[1]
+        b = heappop(heap)[1]
+        c = sorted((x + y for x, y in zip(a, reversed(b))), reverse=True)
+        heappush(heap, (c[-1] - c[0], c))
+    return heap[0][1][0] <= capacity
+
+def complete_greedy(sizes, num_bins, capacity, budget=256):
+    """
+    Depth first search over the assignments, least loaded bin first,
+    bins of same load tried once, stopped after budget nodes
+    """
+    loads = [0]*num_bins
+    left = [budget]
+    def place(j):
+        if j == len(sizes):
+            return True
+        left[0] -= 1
+        if left[0] < 0:
+            return False
+        s = sizes[j]
+        tried = set()
+        for k in sorted(xrange(num_bins), key=loads.__getitem__):
+            u = loads[k]
+            if u + s > capacity or u in tried:
+                continue
+            tried.add(u)
+            loads[k] = u + s
+            if place(j+1):
+                return True
+            loads[k] = u
+        return False
+    return place(0)
+
+def random_restarts(sizes, num_bins, capacity, tries=8, seed=0):
+    """ Best fit of the items in random orders, with a fixed seed """
+    rng = random.Random(seed)
+    order = list(sizes)
+    for t in xrange(tries):
+        rng.shuffle(order)
+        if best_fit(order, num_bins, capacity):
+            return True
+    return False
+
+PACKERS = (('FFD', first_fit_decreasing), ('WFD', worst_fit_decreasing),
+        ('KK', karmarkar_karp), ('complete greedy', complete_greedy),
+        ('restarts', random_restarts))
+
+def successful_packer(items, num_bins, capacity):
+    """
+    Name of the first packer of PACKERS which packs items into num_bins
+    bins, None if none does. items is sorted by decreasing order.
+    """
+    sizes = [i.size for i in items]
+    for name, packer in PACKERS:
+        if packer(sizes, num_bins, capacity):
+            return name
+    return None
+
+
+################## Packing repairs ####################
+
+# Packings are tuples of bins, each bin a tuple of item sizes. An item
+# which does not fit in a packing may fit after one local move: an item
+# moved to another bin, or two items of different bins swapped.
+
+def repairs(bins, capacity):
+    """
+    The local moves (a, y, c, z, room): item y of bin a goes to bin c,
+    and item z of bin c to bin a (z = 0 for a move), leaving room free
+    space in bin a
+    """
+    free = [capacity - sum(b) for b in bins]
+    for a, b in enumerate(bins):
+        for y in set(b):
+            for c, d in enumerate(bins):
+                if c == a:
+                    continue
+                if free[c] >= y:
+                    yield a, y, c, 0, free[a] + y
+                for z in set(d):
+                    if z < y and free[c] >= y - z:
+                        yield a, y, c, z, free[a] + y - z
+
+def insertion_room(bins, capacity):
+    """ Largest item insert_item can add to bins """
+    room = max(capacity - sum(b) for b in bins)
+    for a, y, c, z, r in repairs(bins, capacity):
+        room = max(room, r)
+    return room
+
+def insert_item(bins, w, capacity):
+    """
+    bins plus an item of size w: in the fullest bin it fits in, else
+    after a local move. None if it fails.
+    """
+    best = None
+    for k, b in enumerate(bins):
+        f = capacity - sum(b)
+        if f >= w and (best is None or f < best[0]):
+            best = (f, k)
+    if best is not None:
+        k = best[1]
+        return bins[:k] + (bins[k] + (w,),) + bins[k+1:]
+    for a, y, c, z, room in repairs(bins, capacity):
+        if room >= w:
+            l = [list(b) for b in bins]
+            l[a].remove(y)
+            l[c].append(y)
+            if z:
+                l[c].remove(z)
+                l[a].append(z)
+            l[a].append(w)
+            return tuple(tuple(b) for b in l)
+    return None
+
+
+def main():
+    assert l2_bound([6, 6, 6], 10) == 3
+    # The 7s need a bin each: 2 + ceil(12/10) = 4
+    assert l2_bound([7, 7, 4, 4, 4], 10) == 4
+    # Two 4s per bin: u_2 maps 4 to 10, for bins of 20
+    assert dff_bound([4, 4, 4, 4, 4], 10) == 3
+    assert l2_bound([4, 4, 4, 4, 4], 10) == 2
+    # 8 goes with 2 (exact fill), then 5, 5 together
+    assert mtrp_bound([8, 5, 5, 2], 10) == 2
+    # Each 6 goes with a 3, as 3+2 does not fit: 2 stays alone
+    assert mtrp_bound([6, 6, 3, 3, 2], 10) == 3
+    assert l2_bound([6, 6, 3, 3, 2], 10) == 2
+    assert exceeding_bound([Item(s) for s in [6, 6, 3, 3, 2]], 2, 10) \
+        == 'MTRP'
+    assert exceeding_bound([Item(s) for s in [6, 6, 3, 3, 2]], 3, 10) \
+        is None
+    # 4+3+3 / 4+3+3: best fit puts 4 and 4 together
+    sizes = [4, 4, 3, 3, 3, 3]
+    assert not best_fit(sizes, 2, 10)
+    assert not first_fit_decreasing(sizes, 2, 10)
+    assert worst_fit_decreasing(sizes, 2, 10)
+    assert complete_greedy(sizes, 2, 10)
+    # Differencing gives 8+6 / 7+5+4, worst fit 8+5 / 7+6 and then 4
+    sizes = [8, 7, 6, 5, 4]
+    assert not worst_fit_decreasing(sizes, 2, 16)
+    assert karmarkar_karp(sizes, 2, 16)
+    assert not karmarkar_karp(sizes, 2, 15)
+    assert complete_greedy(sizes, 2, 15)    # 8+7 / 6+5+4
+    assert not karmarkar_karp([5, 5, 5], 2, 7)
+    assert not complete_greedy([5, 5, 5], 2, 7)
+    assert successful_packer([Item(s) for s in [4, 4, 3, 3, 3, 3]], 2, 10) \
+        == 'WFD'
+    # 6+3 / 7: 4 fits after moving 3 into the other bin
+    assert insertion_room(((6, 3), (7,)), 10) == 4
+    bins = insert_item(((6, 3), (7,)), 4, 10)
+    assert sorted(map(sorted, bins)) == [[3, 7], [4, 6]]
+    assert insert_item(((6, 3), (7,)), 1, 10) == ((6, 3, 1), (7,))
+    # 7+2 / 6+3: swapping 7 and 6 (or 3 and 2) frees 2, not 3
+    assert insertion_room(((7, 2), (6, 3)), 10) == 2
+    assert insert_item(((7, 2), (6, 3)), 3, 10) is None
+    bins = bin_factory(2, 10)
+    assert first_fit([Item(s) for s in [6, 5, 4, 3]], bins)
+    assert sorted(b.used() for b in bins) == [8, 10]
+    print "Dummy tests passed"
+
+if __name__ == "__main__":
+    main()
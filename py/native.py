@@ -0,0 +1,143 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+
+"""
+Exact bin packing feasibility in pure Python.
+
+Capacities handled by the adversary search are small integers, so the
+feasibility of a multiset of items can be decided without any external
+solver: a subset-sum bitset for two bins and a branch-and-bound over sorted
+bin loads, with memoization of the failed partial packings, otherwise.
+"""
+
+
+def native_solve(items, num_bins, capacity):
+    """
+    Return True iff the items can be packed into num_bins bins of
+    the given (integer) capacity
+    """
+    sizes = [i.size for i in items]
+    sizes.sort(reverse=True)
+    total = sum(sizes)
+    if total > num_bins*capacity:
+        return False
+    if not sizes or len(sizes) <= num_bins:
+        return True
+    if sizes[0] > capacity:
+        return False
+    if num_bins == 1:
+        return True
+    if num_bins == 2:
+        return bitset_solve(sizes, capacity)
+
+    # Suffix sums of the remaining items
+    rem = [0]*(len(sizes)+1)
+    for k in xrange(len(sizes)-1, -1, -1):
+        rem[k] = rem[k+1] + sizes[k]
+
+    failed = set()
+    loads = [0]*num_bins
+    return pack(sizes, 0, loads, capacity, rem, failed)
+
+
+def bitset_solve(sizes, capacity):
+    """
+    Two bins: some subset of the items has to fill the first bin with
+    a load in [sum - capacity, capacity]
+    """
+    total = sum(sizes)
+    reach = 1
+    mask = (1 << (capacity+1)) - 1
+    for s in sizes:
+        reach = (reach | (reach << s)) & mask
+    low = max(0, total - capacity)
+    return (reach >> low) != 0
+
+
+def pack(sizes, idx, loads, capacity, rem, failed):
+    """
+    Place items sizes[idx:] into bins with current loads.
+    Bins with the same load are interchangeable, so a single one of
+    them is tried; (idx, sorted loads) of failed nodes are memoized.
+    """
+    if idx == len(sizes):
+        return True
+    s = sizes[idx]
+    # Free space in a bin that cannot receive the smallest item is lost
+    smallest = sizes[-1]
+    usable = 0
+    for l in loads:
+        f = capacity - l
+        if f >= smallest:
+            usable += f
+    if rem[idx] > usable:
+        return False
+
+    t = (idx, tuple(sorted(loads)))
+    if t in failed:
+        return False
+
+    prev = -1
+    for b in xrange(len(loads)):
+        l = loads[b]
+        if l == prev or l + s > capacity:
+            continue
+        prev = l
+        loads[b] = l + s
+        if pack(sizes, idx+1, sorted(loads, reverse=True), capacity,
+                rem, failed):
+            loads[b] = l
+            return True
+        loads[b] = l
+
+    failed.add(t)
+    return False
+
+
+def main():
+    from bins import Item
+    it = [Item(i+1) for i in xrange(4)]
+    assert not native_solve(it, 2, 4)
+    assert native_solve(it, 2, 5)
+    assert native_solve(it, 3, 4)
+    it = [Item(s) for s in (6, 6, 5, 5, 4, 4, 3, 3)]
+    assert native_solve(it, 3, 12)
+    assert not native_solve(it, 3, 11)
+    print "Dummy tests passed"
+
+if __name__ == "__main__":
+    main()
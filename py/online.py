@@ -0,0 +1,256 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+"""
+Upper bounds on the value of a state, from online algorithms.
+
+If some online algorithm keeps every bin load at most T from a state,
+whatever the adversary plays, the value of the state is at most T. The
+guarantees below hold against a relaxed adversary, whose items are only
+bounded by the largest feasible weight wmax of the state and by the
+free capacity (the total capacity of the bins minus their loads): the
+real adversary is more constrained, so they remain valid.
+
+Closed forms, for loads sorted by decreasing load:
+ * smallest bin: every item goes to the least loaded bin.
+ * any fit: an item goes to any bin it fits in below T (least loaded,
+   first fit and best fit below T alike). Such an algorithm fails on an
+   item w only if every bin i is loaded above max(load_i, T - w), which
+   requires the total of these loads plus w to fit in the capacity.
+The lookahead plays the first items: for each weight, the bin with the
+best guarantee after it (a threshold strategy chosen online), up to a
+given depth, then the closed forms.
+"""
+
+
+def smallest_bin_bound(loads, free):
+    """ Guarantee of packing all the remaining items in the smallest bin """
+    return max(loads[0], loads[-1] + free)
+
+
+def any_fit_bound(loads, free, wmax):
+    """
+    Guarantee of the algorithms packing an item in any bin where it fits
+    below the threshold, items being at most wmax (<= free)
+    """
+    if wmax <= 0:
+        return loads[0]
+    # Failing on an item w <= wmax needs sum(max(load, T - w + 1)) + w <=
+    # total + free, hardest for w = wmax once T >= min load + wmax: the
+    # loads, raised to h = T - wmax + 1, must exceed total + free - wmax.
+    rest = free - wmax + 1
+    n = len(loads)
+    h = 0
+    for k in xrange(1, n+1):
+        # The k smallest bins are raised to h, the others keep their load
+        rest += loads[n-k]
+        h = -(-rest // k)
+        if k == n or h <= loads[n-k-1]:
+            break
+    return max(loads[0], loads[-1] + wmax, h + wmax - 1)
+
+
+ALGORITHMS = (('smallest bin', smallest_bin_bound),
+        ('any fit', lambda loads, free, wmax: any_fit_bound(loads, free, wmax)))
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+class AlgorithmBounds:
+    """
+    Upper bounds of states from the closed forms, after lookahead moves
+    of the algorithm. A lookahead evaluates at most budget load vectors
+    per state; if it needs more, the closed forms alone are used.
+    """
+    def __init__(self, lookahead=1, budget=256):
+        self.lookahead = lookahead
+        self.budget = budget
+        self.left = 0
+        self.bounds = 0
+        self.cuts = 0
+        self.narrowed = 0
+        self.exceeded = 0
+        self.wins = dict((name, 0) for name, _ in ALGORITHMS)
+        self.wins['lookahead'] = 0
+
+    def closed_form(self, loads, free, wmax):
+        """ Best closed form guarantee (bound, algorithm name) """
+        best = None
+        for name, guarantee in ALGORITHMS:
+            b = guarantee(loads, free, wmax) if name != 'smallest bin' \
+                else guarantee(loads, free)
+            if best is None or b < best[0]:
+                best = (b, name)
+        return best
+
+    def bound(self, loads, free, weights, wmax, target, lookahead=None):
+        """
+        Upper bound of the value of a state with given loads (sorted by
+        decreasing load) and free capacity, the adversary playing weights
+        (by decreasing weight) up to wmax. The lookahead stops once the
+        bound is at most target.
+        """
+        if lookahead is None:
+            lookahead = self.lookahead
+        self.bounds += 1
+        wmax = largest_weight(weights, min(wmax, free))
+        b, name = self.closed_form(loads, free, wmax)
+        if lookahead > 0 and b > target and wmax > 0:
+            self.left = self.budget
+            try:
+                v = self.play(list(loads), free, weights, wmax, target,
+                        lookahead, b)
+            except BudgetExceeded:
+                self.exceeded += 1
+                v = b
+            if v < b:
+                b, name = v, 'lookahead'
+        self.wins[name] += 1
+        return b
+
+    def play(self, loads, free, weights, wmax, target, depth, limit):
+        """
+        Guarantee of the lookahead from loads, or limit if it is no better
+        """
+        worst = target
+        for w in weights:
+            if w > wmax:
+                continue
+            # Smallest guarantee over the bins receiving w
+            best = limit
+            prev = -1
+            for i in xrange(len(loads)):
+                if loads[i] == prev:
+                    continue
+                prev = loads[i]
+                self.left -= 1
+                if self.left < 0:
+                    raise BudgetExceeded()
+                child = sorted(loads[:i] + [prev + w] + loads[i+1:],
+                        reverse=True)
+                cw = largest_weight(weights, min(wmax, free - w))
+                v = self.closed_form(child, free - w, cw)[0]
+                if depth > 1 and v > worst and cw > 0:
+                    v = self.play(child, free - w, weights, cw, worst,
+                            depth - 1, v)
+                if v < best:
+                    best = v
+                    if best <= worst:
+                        break
+            if best > worst:
+                worst = best
+                if worst >= limit:
+                    return limit
+        return worst
+
+    def stats(self):
+        return {'bounds': self.bounds, 'cuts': self.cuts,
+                'narrowed windows': self.narrowed,
+                'budget exceeded': self.exceeded,
+                'best algorithm': dict(self.wins)}
+
+
+def largest_weight(weights, limit):
+    """ Largest of weights (by decreasing weight) at most limit, or 0 """
+    for w in weights:
+        if w <= limit:
+            return w
+    return 0
+
+
+def main():
+    # 3 empty bins of capacity 13: 13 + 2*13/3
+    assert any_fit_bound([0, 0, 0], 39, 13) == 21
+    # Bins of at least 12 leave no room for an item of 5
+    assert any_fit_bound([10, 6, 2], 21, 5) == 16
+    assert any_fit_bound([13, 13, 5], 8, 4) == 13
+    assert any_fit_bound([9, 9, 9], 12, 0) == 9
+    assert smallest_bin_bound([14, 12, 3], 10) == 14
+    b = AlgorithmBounds(lookahead=0)
+    assert b.bound([14, 12, 3], 10, range(13, 0, -1), 13, 0) == 14
+    assert b.stats()['best algorithm']['smallest bin'] == 1
+    # Lookahead: brute force on small states, every strategy included
+    b = AlgorithmBounds(lookahead=2, budget=10**6)
+    ws = range(6, 0, -1)
+    for loads in ([6, 2, 1], [5, 5, 0], [4, 3, 3]):
+        free = 18 - sum(loads)
+        v = b.bound(loads, free, ws, 6, 0)
+        assert v <= b.closed_form(loads, free, min(6, free))[0]
+        assert v >= brute_force(loads, free, ws)
+    check_root_cases()
+    print "Dummy tests passed"
+
+
+def check_root_cases():
+    """ Searches on sampled weights, whose root may be cut by the
+    bounds: the value is never below the lower bound given """
+    import random
+    import upper_bounding as ub
+    ub.config()
+    ub.SOLVER = "NATIVE"
+    ub.fcache_path = None
+    ub.prefetch_threads = 0
+    ub.tt_size = 1
+    cases = [([3, 4], 2, 9, 12), ([1, 5], 2, 9, 12), ([4, 6], 2, 13, 17),
+            ([1, 3], 2, 7, 9)]
+    rng = random.Random(0)
+    for k in xrange(20):
+        capacity = rng.randint(5, 13)
+        weights = sorted(rng.sample(xrange(1, capacity + 1), 2))
+        cases.append((weights, 2, capacity, capacity*4/3))
+    for weights, num_bins, capacity, lb in cases:
+        assert ub.run(weights, num_bins, capacity, lb, trace=False) >= lb
+
+
+def brute_force(loads, free, weights, wmax=None):
+    """ Value of the relaxed game (the best online algorithm) """
+    if wmax is None:
+        wmax = free
+    best = loads[0]
+    for w in weights:
+        if w > min(wmax, free):
+            continue
+        v = min(brute_force(sorted(loads[:i] + [loads[i] + w] + loads[i+1:],
+            reverse=True), free - w, weights, wmax)
+            for i in xrange(len(loads)))
+        best = max(best, v)
+    return best
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+
+"""
+Move ordering of the adversary search (see upper_bounding.branch).
+
+Cuts come earlier when the best moves are tried first: the weight which
+lets the adversary reach the upper bound, and the bin which keeps the
+algorithm below the best stretch found. An ordering sorts the moves of
+a node, and branch() reports the moves which cut so that it can learn.
+
+The result of the search does not depend on the ordering, only the
+number of nodes explored.
+"""
+
+from bins import HASH_MASK
+
+
+class StaticOrdering:
+    """ Weights by decreasing size, bins by decreasing load """
+    def weights(self, state, cands):
+        """ Order of the candidate weights cands (by decreasing size) """
+        return cands
+
+    def bins(self, state, w, positions):
+        """
+        Order of the bins to try for w, given the positions of the
+        bins with distinct loads (by decreasing load). positions is
+        not modified.
+        """
+        return positions
+
+    def cutoff(self, state, w):
+        """ Adversary weight w reached the upper bound """
+        pass
+
+    def best(self, state, w):
+        """ Adversary weight w raised the best stretch """
+        pass
+
+    def refutation(self, state, w, load):
+        """ Putting w in a bin of given load kept the stretch low """
+        pass
+
+    def stats(self):
+        return {}
+
+
+class HistoryOrdering(StaticOrdering):
+    """
+    Weights: the best weight found for the same state, the killer
+    weights of the same depth (number of items), then by history score
+    of the depth, larger weights first on ties.
+    Bins: the load of the bin which refuted w in the same state first,
+    then by decreasing load.
+    The per state tables are arrays of size entries indexed by hash.
+    """
+    def __init__(self, size=2**16, killers=2):
+        self.mask = size - 1
+        self.best_moves = [None]*size
+        self.refutations = [None]*size
+        self.killers = {}
+        self.num_killers = killers
+        self.history = {}
+        self.suggested = 0
+        self.used = 0
+
+    def weights(self, state, cands):
+        if len(cands) < 2:
+            return cands
+        d = state.num_items
+        first = []
+        e = self.best_moves[state.hash & self.mask]
+        if e is not None and e[0] == state.hash and e[1] in cands:
+            first.append(e[1])
+        for w in self.killers.get(d, ()):
+            if w in cands and w not in first:
+                first.append(w)
+        h = self.history.get(d)
+        if h:
+            rest = sorted((w for w in cands if w not in first),
+                    key=lambda w: (-h.get(w, 0), -w))
+        else:
+            rest = [w for w in cands if w not in first]
+        self.suggested += len(first)
+        return first + rest
+
+    def bins(self, state, w, positions):
+        if len(positions) < 2:
+            return positions
+        k = (state.hash + w*0x9E3779B97F4A7C15) & HASH_MASK
+        e = self.refutations[k & self.mask]
+        if e is None or e[0] != k:
+            return positions
+        loads = state.loads
+        for n, i in enumerate(positions):
+            if loads[i] == e[1]:
+                self.used += 1
+                if n:
+                    return [i] + positions[:n] + positions[n+1:]
+                break
+        return positions
+
+    def cutoff(self, state, w):
+        d = state.num_items
+        k = self.killers.setdefault(d, [])
+        if w in k:
+            k.remove(w)
+        k.insert(0, w)
+        del k[self.num_killers:]
+        h = self.history.setdefault(d, {})
+        h[w] = h.get(w, 0) + 1
+        self.best(state, w)
+
+    def best(self, state, w):
+        self.best_moves[state.hash & self.mask] = (state.hash, w)
+
+    def refutation(self, state, w, load):
+        k = (state.hash + w*0x9E3779B97F4A7C15) & HASH_MASK
+        self.refutations[k & self.mask] = (k, load)
+
+    def stats(self):
+        return {'suggested weights': self.suggested,
+                'refuting bins first': self.used}
+
+
+ORDERINGS = {'static': StaticOrdering, 'history': HistoryOrdering}
+
+def make_ordering(name):
+    if name not in ORDERINGS:
+        raise ValueError("Unknown move ordering: %s (among %s)" %
+                (name, ', '.join(sorted(ORDERINGS))))
+    return ORDERINGS[name]()
+
+
+def main():
+    from state import GameState
+    s = GameState(3, 10)
+    s.apply(4, 0)
+    s.apply(4, 1)
+    static = StaticOrdering()
+    assert static.bins(s, 3, [0, 2]) == [0, 2]
+    o = HistoryOrdering()
+    assert o.weights(s, [5, 3, 1]) == [5, 3, 1]
+    o.refutation(s, 3, 0)
+    assert o.bins(s, 3, [0, 2]) == [2, 0] and o.bins(s, 2, [0, 2]) == [0, 2]
+    o.cutoff(s, 1)
+    assert o.weights(s, [5, 3, 1]) == [1, 5, 3]
+    s.apply(1, 2)
+    o.cutoff(s, 3)
+    # Killer of this depth, then history
+    assert o.weights(s, [5, 3, 1]) == [3, 5, 1]
+    print "Dummy tests passed"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+"""
+Speculative feasibility queries, solved by threads ahead of the search.
+
+While branch() explores the son of a node, the queries of its next sons
+are predictable (see bpsolver.prefetch_largest). They are put in a
+bounded queue, served by threads which call the exact backend: the JVM
+through JPype and the Py4J or LP solver processes release the GIL, so
+these calls overlap with the search.
+
+Only the search thread touches the caches of bpsolver: a query needed
+by the search is taken from the prefetcher if it is done, waited for if
+it is running, and taken back from the queue otherwise. The other
+results are collected and recorded by the search thread.
+
+Each node submits its queries in a Batch, cancelled when the node
+returns: the queries of the cancelled batches still in the queue are
+dropped.
+"""
+
+import threading
+import Queue
+from collections import deque
+
+
+class Batch:
+    """ Queries submitted by a node of the search """
+    def __init__(self):
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Job:
+    """ One query: the instance, its key, and its result once done """
+    def __init__(self, key, items, num_bins, capacity, batch):
+        self.key = key
+        self.items = items
+        self.num_bins = num_bins
+        self.capacity = capacity
+        self.batch = batch
+        self.started = False
+        self.dropped = False
+        self.taken = False
+        self.result = None
+        self.done = threading.Event()
+
+
+class Prefetcher:
+    """
+    threads threads run solve(items, num_bins, capacity) on the queries
+    of a queue of queue_size queries. setup() is run first by each
+    thread. A query already queued or running is not submitted again,
+    and a query submitted to a full queue is dropped.
+    """
+    def __init__(self, solve, threads=1, queue_size=64, setup=None):
+        self.solve = solve
+        self.setup = setup
+        self.queue = Queue.Queue(queue_size)
+        self.lock = threading.Lock()
+        # Queued, running and done but not collected jobs by key hash
+        self.jobs = {}
+        self.finished = deque()
+        self.submitted = 0
+        self.duplicates = 0
+        self.full = 0
+        self.cancelled = 0
+        self.solved = 0
+        self.errors = 0
+        self.taken = 0
+        self.waited = 0
+        self.stolen = 0
+        self.threads = []
+        for _ in xrange(threads):
+            th = threading.Thread(target=self.work)
+            th.daemon = True
+            th.start()
+            self.threads.append(th)
+
+    def submit(self, batch, key, items, num_bins, capacity):
+        """ Queues the query of the instance of given key """
+        if not self.threads:
+            return
+        with self.lock:
+            job = self.jobs.get(key[0])
+            if job is not None:
+                if not job.batch.cancelled or job.started:
+                    self.duplicates += 1
+                    return
+                # Queued by a cancelled batch: replaced
+                job.dropped = True
+            job = Job(key, items, num_bins, capacity, batch)
+            try:
+                self.queue.put_nowait(job)
+            except Queue.Full:
+                self.full += 1
+                return
+            self.jobs[key[0]] = job
+            self.submitted += 1
+
+    def work(self):
+        if self.setup:
+            self.setup()
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            with self.lock:
+                if job.dropped or job.batch.cancelled:
+                    if not job.dropped:
+                        self.cancelled += 1
+                        del self.jobs[job.key[0]]
+                    continue
+                job.started = True
+            try:
+                job.result = self.solve(job.items, job.num_bins,
+                        job.capacity)
+            except Exception:
+                # Left to the search thread
+                job.result = None
+                self.errors += 1
+            self.solved += 1
+            self.finished.append(job)
+            job.done.set()
+
+    def take(self, key):
+        """
+        Result of the query of given key if it was submitted, waiting
+        for it if it is running. None otherwise: a query still queued is
+        taken back, the search thread solves it.
+        """
+        with self.lock:
+            job = self.jobs.get(key[0])
+            if job is None or job.key != key:
+                return None
+            if not job.started:
+                job.dropped = True
+                del self.jobs[key[0]]
+                self.stolen += 1
+                return None
+        if not job.done.is_set():
+            self.waited += 1
+            job.done.wait()
+        with self.lock:
+            del self.jobs[key[0]]
+        job.taken = True
+        if job.result is not None:
+            self.taken += 1
+        return job.result
+
+    def collect(self):
+        """ Jobs done since the last call and not taken: (key, items,
+        num_bins, capacity, result) """
+        res = []
+        while self.finished:
+            job = self.finished.popleft()
+            if job.taken:
+                continue
+            with self.lock:
+                if self.jobs.get(job.key[0]) is job:
+                    del self.jobs[job.key[0]]
+            if job.result is not None:
+                res.append((job.key, job.items, job.num_bins, job.capacity,
+                    job.result))
+        return res
+
+    def stop(self):
+        """ Drops the queued queries and ends the threads """
+        with self.lock:
+            for job in self.jobs.itervalues():
+                job.dropped = True
+        for th in self.threads:
+            self.queue.put(None)
+        for th in self.threads:
+            th.join()
+        self.threads = []
+        self.jobs.clear()
+
+    def stats(self):
+        return {'submitted': self.submitted, 'duplicates': self.duplicates,
+                'queue full': self.full, 'cancelled': self.cancelled,
+                'solved': self.solved, 'errors': self.errors,
+                'taken': self.taken, 'waited': self.waited,
+                'taken back': self.stolen}
+
+
+def main():
+    import time
+    gate = threading.Event()
+    def solve(items, num_bins, capacity):
+        gate.wait()
+        return sum(items) <= num_bins*capacity
+    p = Prefetcher(solve, threads=1, queue_size=2)
+    b = Batch()
+    p.submit(b, (1, 1), [3, 4], 2, 3)
+    time.sleep(0.05)
+    p.submit(b, (2, 2), [3, 4], 2, 4)
+    p.submit(b, (2, 2), [3, 4], 2, 4)
+    p.submit(b, (3, 3), [9], 2, 4)
+    p.submit(b, (4, 4), [9], 2, 4)
+    st = p.stats()
+    assert st['duplicates'] == 1 and st['submitted'] == 3 and \
+        st['queue full'] == 1
+    # Queued: taken back
+    assert p.take((2, 2)) is None
+    # (3, 3) is dropped, not (1, 1) which is running
+    b.cancel()
+    gate.set()
+    assert p.take((1, 1)) is False
+    time.sleep(0.05)
+    assert p.collect() == []
+    assert p.stats()['cancelled'] == 1
+    b = Batch()
+    p.submit(b, (5, 5), [1], 2, 4)
+    time.sleep(0.05)
+    assert p.collect() == [((5, 5), [1], 2, 4, True)]
+    p.stop()
+    assert not p.jobs
+    print "Dummy tests passed"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+
+"""
+Compact game state for the adversary search.
+
+The search only needs the multiset of bin loads and the multiset of
+items played so far. Both are kept in small arrays which are updated in
+place by apply/undo, so that exploring a node creates no object.
+"""
+
+from bins import *
+
+
+class GameState(object):
+    """
+    Bin loads, always sorted by decreasing load, and the number of items
+    of each weight. The hash and check words (see bins.ITEM_HASH) of the
+    state and of its items are maintained incrementally.
+    """
+    __slots__ = ('capacity', 'loads', 'counts', 'num_items', 'total',
+            'hash', 'check', 'items_hash', 'items_check', 'pool')
+
+    def __init__(self, num_bins, capacity, max_weight=None):
+        if max_weight is None: max_weight = capacity
+        self.capacity = capacity
+        self.loads = [0]*num_bins
+        self.counts = [0]*(max_weight+1)
+        self.num_items = 0
+        self.total = 0
+        self.items_hash = 0
+        self.items_check = 0
+        self.hash = (num_bins*LOAD_HASH[0]) & HASH_MASK
+        self.check = (num_bins*LOAD_CHECK[0]) & CHECK_MASK
+        # A single Item per weight, shared by all the item lists
+        self.pool = [Item(w) for w in xrange(max_weight+1)]
+
+    def num_bins(self):
+        return len(self.loads)
+
+    def apply(self, w, i):
+        """
+        Adds an item of weight w to the i-th bin.
+        Returns the new position of this bin, to be given to undo()
+        """
+        loads = self.loads
+        u = loads[i]
+        v = u + w
+        self.counts[w] += 1
+        self.num_items += 1
+        self.total += w
+        h = ITEM_HASH[w]
+        c = ITEM_CHECK[w]
+        self.items_hash = (self.items_hash + h) & HASH_MASK
+        self.items_check = (self.items_check + c) & CHECK_MASK
+        self.hash = (self.hash + h - LOAD_HASH[u] + LOAD_HASH[v]) & HASH_MASK
+        self.check = (self.check + c - LOAD_CHECK[u] + LOAD_CHECK[v]) \
+                & CHECK_MASK
+        while i and loads[i-1] < v:
+            loads[i] = loads[i-1]
+            i -= 1
+        loads[i] = v
+        return i
+
+    def undo(self, w, i):
+        """ Removes an item of weight w from the i-th bin """
+        loads = self.loads
+        v = loads[i]
+        u = v - w
+        self.counts[w] -= 1
+        self.num_items -= 1
+        self.total -= w
+        h = ITEM_HASH[w]
+        c = ITEM_CHECK[w]
+        self.items_hash = (self.items_hash - h) & HASH_MASK
+        self.items_check = (self.items_check - c) & CHECK_MASK
+        self.hash = (self.hash - h + LOAD_HASH[u] - LOAD_HASH[v]) & HASH_MASK
+        self.check = (self.check - c + LOAD_CHECK[u] - LOAD_CHECK[v]) \
+                & CHECK_MASK
+        last = len(loads) - 1
+        while i < last and loads[i+1] > u:
+            loads[i] = loads[i+1]
+            i += 1
+        loads[i] = u
+
+    def items(self):
+        """ The items played so far, largest first """
+        l = []
+        pool = self.pool
+        counts = self.counts
+        for w in xrange(len(counts)-1, 0, -1):
+            if counts[w]:
+                l.extend([pool[w]]*counts[w])
+        return l
+
+    def contents(self):
+        """ Picklable description of the state (see restore) """
+        return (self.capacity, self.loads[:], self.counts[:])
+
+
+def restore(contents):
+    """ The GameState described by GameState.contents() """
+    capacity, loads, counts = contents
+    s = GameState(len(loads), capacity, len(counts)-1)
+    loads = sorted(loads, reverse=True)
+    # Play the items of each weight in the first bin, then fix the loads
+    for w in xrange(len(counts)):
+        for k in xrange(counts[w]):
+            s.apply(w, 0)
+    for i in xrange(len(loads)):
+        s.hash = (s.hash - LOAD_HASH[s.loads[i]] + LOAD_HASH[loads[i]])\
+                & HASH_MASK
+        s.check = (s.check - LOAD_CHECK[s.loads[i]] + LOAD_CHECK[loads[i]])\
+                & CHECK_MASK
+    s.loads = loads
+    return s
+
+
+def main():
+    s = GameState(3, 10)
+    h = s.hash
+    i = s.apply(4, 2)
+    assert i == 0 and s.loads == [4, 0, 0]
+    j = s.apply(3, 1)
+    assert j == 1 and s.loads == [4, 3, 0]
+    k = s.apply(2, 1)
+    assert k == 0 and s.loads == [5, 4, 0]
+    t = restore(s.contents())
+    assert (t.loads, t.counts, t.hash, t.check) == \
+        (s.loads, s.counts, s.hash, s.check)
+    s.undo(2, k)
+    s.undo(3, j)
+    s.undo(4, i)
+    assert s.loads == [0, 0, 0] and s.hash == h and s.num_items == 0
+    print "Dummy tests passed"
+
+if __name__ == "__main__":
+    main()
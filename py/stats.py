@@ -0,0 +1,221 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+"""
+Instrumentation of the search: named counters and latency histograms.
+
+Nothing is recorded unless `enabled` is set (option --stats): call sites
+test `stats.enabled` before calling into this module, so that a run
+without instrumentation only pays this test.
+
+Counters are grouped by name prefix in summary():
+    cut: ...        cut reasons of branch (backtrack.attr['cut'])
+    memo: ...       transposition table lookups
+    mem: ...        in-memory feasibility results of bpsolver
+    oracle: ...     known answers of the largest feasible weight
+    resolved: ...   stage of is_feasible deciding a query (trivial,
+                    mem, prefetch, witness, frontier, heuristics, L2,
+                    DFF, MTRP, pcache, exact)
+    vectorized: ... candidate weights classified at once (feasible,
+                    infeasible, undecided)
+    packer: ...     heuristic packing feasible instances (BFD, FFD...)
+    witness: ...    packings of the node items: known, inserted (from
+                    the packing of the parent) or miss
+Histograms give the latency of the exact solver, per backend.
+"""
+
+import sys
+import time
+import json
+import math
+
+enabled = False
+counters = {}
+histograms = {}
+
+# Periodic progress report (see start)
+interval = None
+out = sys.stderr
+snapshot = None
+t_start = time.time()
+t_report = 0.
+ticks = 0
+TICKS = 1024
+
+
+def count(name, n=1):
+    counters[name] = counters.get(name, 0) + n
+
+
+class Histogram(object):
+    """ Counts of durations by power of 2 of microseconds """
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+
+    def add(self, seconds):
+        us = seconds*1e6
+        k = int(math.ceil(math.log(us, 2))) if us > 1 else 0
+        self.buckets[k] = self.buckets.get(k, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def merge(self, other):
+        for k, n in other.buckets.iteritems():
+            self.buckets[k] = self.buckets.get(k, 0) + n
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def summary(self):
+        mean = self.total/self.count if self.count else 0.
+        return {'count': self.count, 'mean ms': 1e3*mean,
+                'max ms': 1e3*self.max,
+                'buckets': dict(("<= %dus" % 2**k, n)
+                    for k, n in self.buckets.iteritems())}
+
+
+def observe(backend, seconds):
+    h = histograms.get(backend)
+    if h is None:
+        h = histograms[backend] = Histogram()
+    h.add(seconds)
+
+
+def start(report_interval=None, stream=sys.stderr, snap=None):
+    """
+    Enables the instrumentation.
+    report_interval -- seconds between two JSON progress lines on stream
+        (None: no progress report)
+    snap -- snap() gives the figures of the search added to the reports
+    """
+    global enabled, interval, out, snapshot, t_start, t_report
+    enabled = True
+    interval = report_interval
+    out = stream
+    snapshot = snap
+    t_start = t_report = time.time()
+
+
+def tick():
+    """ Called once per node: reports the progress every interval """
+    global ticks
+    ticks += 1
+    if ticks % TICKS == 0 and interval is not None:
+        report()
+
+
+def report(force=False):
+    """ Writes the summary as a JSON line, if interval has elapsed """
+    global t_report
+    t = time.time()
+    if not force and (interval is None or t - t_report < interval):
+        return
+    t_report = t
+    out.write(json.dumps(summary(), sort_keys=True) + "\n")
+    out.flush()
+
+
+def rate(hits, misses):
+    lookups = hits + misses
+    return float(hits)/lookups if lookups else 0.
+
+
+def summary():
+    """ All the figures, as a JSON-serializable dictionary """
+    s = {'elapsed': time.time() - t_start}
+    if snapshot is not None:
+        s.update(snapshot())
+    groups = {}
+    for name, n in counters.iteritems():
+        group, _, key = name.partition(': ')
+        groups.setdefault(group, {})[key] = n
+    for group, c in groups.iteritems():
+        if 'hit' in c or 'miss' in c:
+            c['hit rate'] = rate(c.get('hit', 0), c.get('miss', 0))
+        s[group] = c
+    s['latency'] = dict((b, h.summary()) for b, h in histograms.iteritems())
+    return s
+
+
+def take():
+    """ Returns the counters and histograms, and resets them: workers
+    send them to the main process, which merges them """
+    global counters, histograms
+    r = (counters, histograms)
+    counters = {}
+    histograms = {}
+    return r
+
+
+def merge(taken):
+    c, hs = taken
+    for name, n in c.iteritems():
+        count(name, n)
+    for backend, h in hs.iteritems():
+        if backend not in histograms:
+            histograms[backend] = Histogram()
+        histograms[backend].merge(h)
+
+
+def main():
+    import StringIO
+    s = StringIO.StringIO()
+    start(0, s, lambda: {'nodes': 3})
+    count('cut: LB >= UB')
+    count('mem: hit', 3)
+    count('mem: miss')
+    observe('NATIVE', 3e-6)
+    observe('NATIVE', 0.5)
+    report(force=True)
+    d = json.loads(s.getvalue())
+    assert d['nodes'] == 3 and d['cut']['LB >= UB'] == 1
+    assert d['mem']['hit rate'] == 0.75
+    assert d['latency']['NATIVE']['count'] == 2
+    t = take()
+    assert not counters
+    merge(t)
+    merge(t)
+    assert counters['mem: hit'] == 6 and histograms['NATIVE'].count == 4
+    print "Dummy tests passed"
+
+if __name__ == "__main__":
+    main()
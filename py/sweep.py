@@ -0,0 +1,164 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+"""
+Sweep over many instances, to find where the lower bound improves.
+
+    python py/sweep.py --capacities 10-20 --bins 3-4 [-r R --seeds 1 2 3]
+        [--jobs J] [-o results.jsonl]
+
+Every (C, N, seed) is a job of a pool of J worker processes, the largest
+expected first. Each job is a search from scratch in a new process, but
+all of them share the feasibility cache file of config.conf (its keys
+include the bins and the capacity) and, with CHOCO4J, the solver
+daemons started by the sweep. A row is printed as each job finishes.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+
+import upper_bounding
+import bpsolver
+from benchmark import measure, case_key
+
+
+def parse_range(s):
+    """ "10-20" -> [10, ..., 20], "12" -> [12] """
+    if '-' in s:
+        a, b = s.split('-')
+        return range(int(a), int(b)+1)
+    return [int(s)]
+
+
+def expected_cost(job):
+    """ Rough size of the game tree, used to start the largest first """
+    return (job.get('r') or job['C']) * job['C']**(job['N']-1)
+
+
+def make_jobs(capacities, bins, solver, r=None, seeds=()):
+    jobs = []
+    for capacity in capacities:
+        for num_bins in bins:
+            if r:
+                for seed in seeds:
+                    jobs.append({'C': capacity, 'N': num_bins,
+                        'solver': solver, 'r': min(r, capacity),
+                        'seed': seed})
+            else:
+                jobs.append({'C': capacity, 'N': num_bins, 'solver': solver})
+    jobs.sort(key=expected_cost, reverse=True)
+    return jobs
+
+
+def run_job(args):
+    job, tt_size, fcache_path = args
+    try:
+        return measure(job, tt_size, fcache_path)
+    except Exception as e:
+        return dict(job, error=repr(e))
+
+
+HEADER = "%-28s %6s %10s %9s %10s %7s" % ("job", "value", "stretch",
+        "time (s)", "nodes", "calls")
+
+def row(res):
+    if 'error' in res:
+        return "%-28s error: %s" % (case_key(res), res['error'])
+    return "%-28s %6s %10.4f %9.2f %10d %7d%s" % (case_key(res),
+            res['value'], float(res['value'])/res['C'], res['time'],
+            res['nodes'], res['exact calls'],
+            "  improved" if res['improved'] else "")
+
+
+def main():
+    p = argparse.ArgumentParser(description='Runs the search over ranges\
+            of capacities and numbers of bins')
+    p.add_argument('--capacities', required=True,
+            help='capacities, e.g. 10-20')
+    p.add_argument('--bins', default='3', help='numbers of bins, e.g. 3-4')
+    p.add_argument('-r', type=int, help='samples R weights in 1..C')
+    p.add_argument('--seeds', type=int, nargs='+', default=[0],
+            help='random seeds of the samples of -r (default: 0)')
+    p.add_argument('--jobs', type=int, default=multiprocessing.cpu_count(),
+            help='number of worker processes (default: number of CPUs)')
+    p.add_argument('--tt-size', type=float, default=None,
+            help='transposition table size in MB, per worker\
+                (default: tt-size in config.conf split between the workers)')
+    p.add_argument('-o', '--output',
+            help='appends the results to this file, one JSON per line')
+    args = p.parse_args()
+
+    sys.argv[0] = upper_bounding.__file__
+    upper_bounding.config()
+    ub = upper_bounding
+    solver = ub.SOLVER
+    tt_size = args.tt_size or float(ub.tt_size)/args.jobs
+    jobs = make_jobs(parse_range(args.capacities), parse_range(args.bins),
+            solver, args.r, args.seeds)
+    print "%d jobs on %d workers, solver %s, feasibility cache %s" % \
+            (len(jobs), args.jobs, solver, ub.fcache_path)
+
+    # A new process per job: the searches start from empty memories
+    pool = multiprocessing.Pool(args.jobs, maxtasksperchild=1)
+    # The daemons are started once; the runs of the jobs attach to them
+    bpsolver.init_solver(solver, ub.jarpath, daemons=ub.daemons,
+            daemon_file=ub.daemon_file)
+
+    out = open(args.output, 'a') if args.output else None
+    t0 = time.time()
+    print HEADER
+    try:
+        for res in pool.imap_unordered(run_job,
+                [(job, tt_size, ub.fcache_path) for job in jobs]):
+            print row(res)
+            sys.stdout.flush()
+            if out:
+                out.write(json.dumps(res, sort_keys=True) + "\n")
+                out.flush()
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        bpsolver.terminate_solver(solver)
+        if out: out.close()
+    print "Total elapsed time: %s" % (time.time() - t0)
+
+if __name__ == "__main__":
+    main()
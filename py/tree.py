@@ -35,7 +35,13 @@
 # knowledge of the CeCILL license and that you accept its terms.
 ##########################################################################
 
+from cStringIO import StringIO
+
+
 class TreeNode(list):
+    """ Node of the decision tree of the adversary: its sons are the
+    list items, its labels the attr dict """
+    __slots__ = ('attr',)
 
     def __init__(self, iterable=(), **attributes):
         self.attr = attributes
@@ -51,32 +57,133 @@ class TreeNode(list):
     def id(self):
         return "n"+str(id(self))
 
+    def child(self, **attributes):
+        """ New node meant to become a son of self """
+        return TreeNode(**attributes)
+
     def set_input(self, inp=[]):
         """ Propagates Next weight to the sons in order
         to keep track of the input sequence """
-        if self.is_leaf():
-            self.attr['input'] = inp[:]
-        if 'Next weight' in self.attr:
-            inp.append(self.attr['Next weight'])
-        for node in self: node.set_input(inp[:])
+        stack = [(self, input_chain(inp))]
+        while stack:
+            node, chain = stack.pop()
+            if node.is_leaf():
+                node.attr['input'] = chain_list(chain)
+            if 'Next weight' in node.attr:
+                chain = (node.attr['Next weight'], chain)
+            stack.extend((son, chain) for son in node)
 
     def dot(self):
-        s  = "digraph {\n"
-        s += self.dot_enc()
-        return s + "}\n"
+        s = StringIO()
+        self.write_dot(s)
+        return s.getvalue()
+
+    def write_dot(self, f, inputs=False):
+        """
+        Writes the tree in DOT format to the file f, node by node.
+        inputs -- label the leaves with their input sequence, as
+            set_input does
+        """
+        f.write("digraph {\n")
+        stack = [(self, None)]
+        while stack:
+            node, chain = stack.pop()
+            labels = ["%s: %s" % (i, label(j))
+                    for i, j in node.attr.iteritems()]
+            if inputs and node.is_leaf() and 'input' not in node.attr:
+                labels.append("input: %s" % chain_list(chain))
+            f.write("%s [label=\"%s\"];\n" % (node.id(), "\\n".join(labels)))
+            if 'Next weight' in node.attr:
+                chain = (node.attr['Next weight'], chain)
+            for son in node:
+                f.write("%s -> %s;\n" % (node.id(), son.id()))
+            for son in reversed(node):
+                stack.append((son, chain))
+        f.write("}\n")
+
+
+class NullNode(TreeNode):
+    """ Records nothing: decision tree of a search run without trace """
+    __slots__ = ()
+
+    def __init__(self):
+        TreeNode.__init__(self)
+        self.attr = Sink()
+
+    def child(self, **attributes):
+        return self
+
+    def append(self, node):
+        pass
+
+    def extend(self, nodes):
+        pass
+
+
+class Sink(dict):
+    """ Dictionary ignoring writes """
+    def __setitem__(self, key, value):
+        pass
+
+    def update(self, *args, **kwargs):
+        pass
+
+
+def input_chain(inp):
+    """ Input sequence as a linked list (last, (previous, ...)), so that
+    sons share the sequence of their father """
+    chain = None
+    for w in inp:
+        chain = (w, chain)
+    return chain
+
+def chain_list(chain):
+    inp = []
+    while chain is not None:
+        w, chain = chain
+        inp.append(w)
+    inp.reverse()
+    return inp
+
+def label(value):
+    # Bin loads are recorded as tuples
+    if isinstance(value, tuple):
+        return str(list(value))
+    return str(value)
 
-    def dot_enc(self):
-        s = self.id()+" [label=\""
 
-        for i,j in self.attr.iteritems():
-            s += i+": "+str(j)+"\\n"
-        if self.attr:
-            s = s[:-2]
-        s += "\"];\n"
+def main():
+    root = TreeNode(Name="Root")
+    root.attr['Next weight'] = 3
+    a = root.child(bins=(3, 0))
+    b = root.child(bins=(0, 3))
+    b.attr['Next weight'] = 2
+    b.append(b.child(bins=(2, 3)))
+    root.extend([a, b])
+    root.set_input()
+    assert a.attr['input'] == [3] and b[0].attr['input'] == [3, 2]
+    assert 'input' not in b.attr
+    assert "bins: [2, 3]\\ninput: [3, 2]" in root.dot() or \
+            "input: [3, 2]\\nbins: [2, 3]" in root.dot()
+    assert root.dot().count("->") == 3
 
-        for i in self:
-            s += self.id()+" -> "+i.id()+";\n"
-            s += i.dot_enc()
+    # Deep trees do not hit the recursion limit
+    deep = node = TreeNode()
+    for i in xrange(100000):
+        node.attr['Next weight'] = 1
+        node.append(node.child())
+        node = node[0]
+    s = StringIO()
+    deep.write_dot(s, inputs=True)
+    assert s.getvalue().count("->") == 100000
+    deep.set_input()
+    assert len(node.attr['input']) == 100000
 
-        return s
+    n = NullNode()
+    n.attr['cut'] = "x"
+    n.extend([n.child(bins=(1,))])
+    assert not n.attr and n.is_leaf() and n.child() is n
+    print "Dummy tests passed"
 
+if __name__ == "__main__":
+    main()
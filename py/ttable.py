@@ -0,0 +1,223 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+
+"""
+Transposition table for the adversary search.
+
+Each entry stores a lower and an upper bound on the value of a state,
+merged with the bounds already known. The table is made of fixed-size
+arrays so that its memory footprint is set in megabytes. Slots are
+grouped by pairs: the first slot of a pair keeps the entry with the
+largest subtree (number of nodes explored to compute it), the second one
+is always replaced.
+"""
+
+import zlib
+from array import array
+
+INFINITY = float('inf')
+EMPTY = -1
+
+class TranspositionTable:
+    """ (key, check) -> (lower, upper) bounds on the value of a state """
+
+    # key, check, lower, upper, work
+    SLOT_BYTES = array('l').itemsize + array('i').itemsize \
+            + 2*array('d').itemsize + array('L').itemsize
+
+    def __init__(self, megabytes):
+        pairs = max(1, int(megabytes*2**20 / (2*self.SLOT_BYTES)))
+        self.pairs = pairs
+        size = 2*pairs
+        self.keys = array('l', [EMPTY])*size
+        self.checks = array('i', [0])*size
+        self.lower = array('d', [0.])*size
+        self.upper = array('d', [0.])*size
+        self.work = array('L', [0])*size
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+        self.replacements = 0
+
+    def megabytes(self):
+        return 2.*self.pairs*self.SLOT_BYTES / 2**20
+
+    def find(self, key, check):
+        """ Slot of the entry, -1 if absent """
+        s = 2*(key % self.pairs)
+        keys = self.keys
+        checks = self.checks
+        if keys[s] == key and checks[s] == check: return s
+        if keys[s+1] == key and checks[s+1] == check: return s+1
+        if keys[s] == key or keys[s+1] == key:
+            self.collisions += 1
+        return -1
+
+    def lookup(self, key, check):
+        """ Bounds (lower, upper) on the value, or None """
+        s = self.find(key, check)
+        if s < 0:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return as_value(self.lower[s]), as_value(self.upper[s])
+
+    def store(self, key, check, lower_bound, upper_bound, val, work):
+        """
+        Records the value val returned by a search within
+        ]lower_bound, upper_bound[ which explored work nodes
+        """
+        if lower_bound >= upper_bound:
+            return
+        if val <= lower_bound:
+            lower, upper = -INFINITY, val
+        elif val >= upper_bound:
+            lower, upper = val, INFINITY
+        else:
+            lower = upper = val
+        self.stores += 1
+
+        s = self.find(key, check)
+        if s >= 0:
+            self.lower[s] = max(self.lower[s], lower)
+            self.upper[s] = min(self.upper[s], upper)
+            self.work[s] = min(self.work[s] + work, 0xFFFFFFFF)
+            if s % 2 and self.work[s] > self.work[s-1]:
+                self.swap(s-1, s)
+            return
+
+        s = 2*(key % self.pairs)
+        keys = self.keys
+        if keys[s] != EMPTY:
+            if keys[s+1] != EMPTY:
+                self.replacements += 1
+            if work >= self.work[s]:
+                # Former first entry goes to the always-replace slot
+                self.copy(s, s+1)
+            else:
+                s += 1
+        self.keys[s] = key
+        self.checks[s] = check
+        self.lower[s] = lower
+        self.upper[s] = upper
+        self.work[s] = min(work, 0xFFFFFFFF)
+
+    def copy(self, s, t):
+        self.keys[t] = self.keys[s]
+        self.checks[t] = self.checks[s]
+        self.lower[t] = self.lower[s]
+        self.upper[t] = self.upper[s]
+        self.work[t] = self.work[s]
+
+    def swap(self, s, t):
+        for a in (self.keys, self.checks, self.lower, self.upper, self.work):
+            a[s], a[t] = a[t], a[s]
+
+    def dump(self):
+        """ Picklable contents of the table (see load). The arrays, mostly
+        made of empty slots, are compressed """
+        return {'pairs': self.pairs,
+                'arrays': [zlib.compress(a.tostring(), 1) for a in
+                    (self.keys, self.checks, self.lower, self.upper,
+                        self.work)],
+                'counters': (self.hits, self.misses, self.collisions,
+                    self.stores, self.replacements)}
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        rate = float(self.hits)/lookups if lookups else 0.
+        return {'hits': self.hits, 'misses': self.misses,
+                'hit rate': rate, 'collisions': self.collisions,
+                'stores': self.stores, 'replacements': self.replacements,
+                'megabytes': self.megabytes()}
+
+
+def load(dump):
+    """ The TranspositionTable given by TranspositionTable.dump() """
+    t = TranspositionTable(0)
+    t.pairs = dump['pairs']
+    arrays = []
+    for a, data in zip((t.keys, t.checks, t.lower, t.upper, t.work),
+            dump['arrays']):
+        a = array(a.typecode)
+        a.fromstring(zlib.decompress(data))
+        arrays.append(a)
+    t.keys, t.checks, t.lower, t.upper, t.work = arrays
+    (t.hits, t.misses, t.collisions, t.stores, t.replacements) = \
+            dump['counters']
+    return t
+
+
+def as_value(x):
+    """ Values are stored as floats: integer values are given back as int """
+    if x.is_integer(): return int(x)
+    return x
+
+
+def main():
+    tt = TranspositionTable(0.001)
+    assert tt.lookup(12, 3) is None
+    tt.store(12, 3, 10, 20, 10, 5)     # value <= 10
+    assert tt.lookup(12, 3) == (-INFINITY, 10)
+    assert tt.lookup(12, 4) is None
+    tt.store(12, 3, 5, 20, 8, 5)       # value == 8
+    assert tt.lookup(12, 3) == (8, 8)
+    k = 12 + tt.pairs
+    tt.store(k, 1, 5, 20, 30, 1)       # value >= 30, smaller subtree
+    assert tt.lookup(12, 3) == (8, 8)
+    assert tt.lookup(k, 1) == (30, INFINITY)
+    tt.store(k + tt.pairs, 1, 5, 20, 7, 100)
+    assert tt.lookup(k + tt.pairs, 1) == (7, 7)
+    assert tt.lookup(12, 3) == (8, 8)
+    assert tt.lookup(k, 1) is None
+    # Same key, other check word: both slots of the pair are looked at
+    k = 13
+    tt.store(k, 1, 5, 20, 6, 100)
+    tt.store(k, 2, 5, 20, 9, 1)
+    assert tt.lookup(k, 1) == (6, 6)
+    assert tt.lookup(k, 2) == (9, 9)
+    tt.store(k, 2, 5, 20, 9, 1000)
+    assert tt.lookup(k, 1) == (6, 6)
+    assert tt.lookup(k, 2) == (9, 9)
+    t2 = load(tt.dump())
+    assert t2.pairs == tt.pairs and t2.keys == tt.keys
+    assert t2.lookup(12, 3) == (8, 8)
+    print "Dummy tests passed"
+
+if __name__ == "__main__":
+    main()
@@ -51,31 +51,54 @@ Remark: if memory is an issue, search for "MEMORY" comments and you will
 import time
 from bins import *
 from bpsolver import *
+import bpsolver
 import argparse
-import binascii
 import random
 import yaml
 import os, sys
+import math
+import json
+import multiprocessing
+import stats
 from tree import *
+import certificate
+from state import GameState, restore
 from time import gmtime, strftime
 
-# An LRU dict for memoization purposes
-from pylru import lrucache
+import ttable
+from ttable import TranspositionTable
+from dominance import DominanceIndex
+from ordering import StaticOrdering, make_ordering
+from online import AlgorithmBounds
+from prefetch import Batch
+import checkpoint
 
 ################## Engine ####################
 
-def run(weights, num_bins, capacity=1, lower_bound=-1):
+def run(weights, num_bins, capacity=1, lower_bound=-1, jobs=1,
+        split_depth=2, trace=True, certificate=None, checkpoint_file=None,
+        resume=False):
     """Finds the best feasible upper bound within given limits
 
     Keyword arguments:
     weights -- the set of allowed weights
     num_bins -- number of bins
     capacity -- bins capacity
+    jobs -- number of worker processes (default 1: sequential search)
+    split_depth -- number of adversary levels expanded into independent
+        subproblems when jobs > 1
+    trace -- write the decision tree of the adversary to backtrack.dot
+    certificate -- file receiving the strategy of the adversary, if the
+        lower bound is improved (see certificate.py)
+    checkpoint_file -- file where the sequential search is saved every
+        checkpoint_interval seconds (see checkpoint.py). The decision
+        tree is then not recorded
+    resume -- restart from the checkpoint file
 
     Return maximal capacity required
     (stretching factor = ret / capacity)
     """
-    bins = bin_factory(num_bins, capacity)
+    state = GameState(num_bins, capacity)
 
     # Keep only feasible weights
     ws = []
@@ -85,30 +108,63 @@ def run(weights, num_bins, capacity=1, lower_bound=-1):
 
     # Sort items by decreasing order of their weights
     ws.sort(reverse=True)
-    # WARNING: if the order is changed then, feasibility has to be verified
-    # for every item ! cf boolean feasibilityVerified in branch()
-
-    init_solver(SOLVER, jarpath)
-    if SOLVER == "CHOCO" or SOLVER == "CP":
-        run_jvm(jvmpath, jarpath)
-
-    # Create cache
-    if cache_size <= 0: d = {}
-    else: d = lrucache(cache_size)
+    # Feasibility is monotone in the weight: branch() only asks for the
+    # largest feasible one (see largest_feasible_weight)
 
     if lower_bound < 0:
         lower_bound = capacity
 
-    root=TreeNode()
-    root.attr['Name']="Root"
-    val = branch(ws, bins, num_bins*capacity, lower_bound, 26.*capacity/17.,
-            d, backtrack=root)
-    root.set_input()
-    #strftime("%Y-%m-%d %H:%M:%S", gmtime())
-    f = open('backtrack.dot', 'w')
-    f.write(root.dot())
-    f.close()
+    if checkpoint_file:
+        if jobs > 1:
+            raise NameError('Checkpoints require a sequential search')
+        # Subtrees finished before a checkpoint are not in the tree
+        trace = False
+
+    if jobs > 1:
+        # Workers are forked before a JVM is started in this process
+        shared_lb = multiprocessing.Value('d', lower_bound)
+        pool = multiprocessing.Pool(jobs, init_worker,
+                (shared_lb, trace, jobs))
 
+    init_solver(SOLVER, jarpath, daemons=daemons, daemon_file=daemon_file)
+    if SOLVER == "CHOCO" or SOLVER == "CP":
+        run_jvm(jvmpath, jarpath)
+    if fcache_path:
+        open_cache(fcache_path)
+    if prefetch_threads and jobs == 1:
+        start_prefetch(SOLVER, prefetch_threads, prefetch_queue)
+
+    # Only the subtrees of the best moves are kept (see branch)
+    if trace:
+        root = TreeNode(Name="Root")
+    else:
+        root = NullNode()
+    if jobs > 1:
+        val = parallel_branch(pool, shared_lb, ws, state, num_bins*capacity,
+                lower_bound, 26.*capacity/17., split_depth, root)
+        pool.close()
+        pool.join()
+    else:
+        global memo, dominance, ordering, algorithms
+        if resume:
+            resume_search(checkpoint_file, ws, num_bins, capacity, lower_bound)
+        else:
+            memo = make_memo()
+        dominance = make_dominance()
+        ordering = make_ordering(move_ordering)
+        algorithms = make_algorithms()
+        val = checkpointed_branch(ws, state, num_bins*capacity, lower_bound,
+                26.*capacity/17., root, checkpoint_file)
+    #strftime("%Y-%m-%d %H:%M:%S", gmtime())
+    if trace:
+        f = open('backtrack.dot', 'w')
+        root.write_dot(f, inputs=True)
+        f.close()
+    if certificate and val > lower_bound:
+        write_certificate(certificate, ws, num_bins, capacity,
+                int(math.ceil(val)))
+
+    stop_prefetch()
     terminate_solver(SOLVER)
 
     """ Memory profiling
@@ -120,140 +176,522 @@ def run(weights, num_bins, capacity=1, lower_bound=-1):
     return val
 
 
+memo = None
+def make_memo(share=1):
+    """ Table of tt_size MB, split between share processes """
+    return TranspositionTable(float(tt_size)/share)
+
+# Order of the moves in branch (see ordering.py)
+ordering = StaticOrdering()
+
+# States with the same loads and refined items (see dominance.py)
+dominance = None
+def make_dominance():
+    if not dominance_states:
+        return None
+    return DominanceIndex(dominance_states)
+
+# Upper bounds of the states from online algorithms (see online.py)
+algorithms = None
+def make_algorithms():
+    if algorithm_lookahead < 0:
+        return None
+    return AlgorithmBounds(algorithm_lookahead, algorithm_budget)
+
+
+def search_figures():
+    """ Global counters of the search, for stats reports """
+    figures = {'nodes': nodes, 'feasibility checks': fcalls,
+            'feasibility time': ttime, 'exact calls': bpsolver.calls,
+            'probes': bpsolver.probes}
+    if bpsolver.bound_rejects:
+        figures['bound rejects'] = dict(bpsolver.bound_rejects)
+    if bpsolver.packer_wins:
+        figures['packer wins'] = dict(bpsolver.packer_wins)
+    for (n, c), f in bpsolver.frontiers.items():
+        figures['frontier %d bins of %d' % (n, c)] = f.stats()
+    if memo:
+        figures['transposition table'] = memo.stats()
+    if dominance:
+        figures['dominance'] = dominance.stats()
+    if algorithms:
+        figures['algorithm bounds'] = algorithms.stats()
+    if bpsolver.prefetcher:
+        figures['prefetch'] = bpsolver.prefetcher.stats()
+    figures['move ordering'] = ordering.stats()
+    return figures
+
+
+def write_certificate(path, weights, num_bins, capacity, target):
+    """
+    Writes the strategy of the adversary forcing target. The strategy is
+    searched again with the window ]target-1, target[, mostly answered by
+    the transposition table of the search.
+    """
+    global memo
+    if memo is None:
+        memo = make_memo()
+    def wins(state, rem_cap):
+        return solve(memo, state, target-1, target, rem_cap, weights,
+                NullNode()) >= target
+    def largest(state):
+        return largest_feasible_weight(state, weights)
+    f = open(path, 'w')
+    n = certificate.write(f, GameState(num_bins, capacity), num_bins*capacity,
+            weights, target, largest, wins)
+    f.close()
+    print "\nCertificate: %d adversary moves written to %s" % (n, path)
+
+
+####### Checkpoints #######
+
+checkpoint_interval = 600
+next_checkpoint = None
+# Frames of the DFS position to resume from, the root one last
+resume_frames = []
+
+def checkpointed_branch(weights, state, rem_cap, lower_bound, upper_bound,
+        backtrack, path):
+    """ branch() at the root, saved to path every checkpoint_interval """
+    global next_checkpoint, resume_frames
+    if not path:
+        return branch(weights, state, rem_cap, lower_bound, upper_bound,
+                memo, backtrack)
+    t0 = time.time()
+    while True:
+        next_checkpoint = time.time() + checkpoint_interval
+        try:
+            val = branch(weights, state, rem_cap, lower_bound, upper_bound,
+                    memo, backtrack)
+            next_checkpoint = None
+            return val
+        except checkpoint.Checkpoint as e:
+            # All the moves have been undone: state is the root state
+            resume_frames = e.frames
+            checkpoint.save(path, {
+                'instance': (weights, len(state.loads), state.capacity,
+                    lower_bound),
+                'frames': e.frames, 'memo': memo.dump(), 'mem': bpsolver.mem,
+                'largest': bpsolver.largest_mem, 'nodes': nodes,
+                'fcalls': fcalls, 'probes': bpsolver.probes,
+                'calls': bpsolver.calls})
+            print "\nCheckpoint saved to %s (%d nodes, depth %d, %.1fs)" % \
+                    (path, nodes, len(e.frames), time.time() - t0)
+
+
+def resume_position(state, window):
+    """
+    Position (order, w, bins, k, stretch, best_stretch) of the branch()
+    on state within window, if it is the next frame to resume: the
+    orders of the weights and of the bins of w, and the index k of the
+    bin in progress. Otherwise the search has left the saved path: the
+    frames are dropped.
+    """
+    key, win, order, w, bins, k, stretch, best_stretch = resume_frames.pop()
+    if key != make_key(state) or win != window:
+        del resume_frames[:]
+        return None
+    return order, w, bins, k, stretch, best_stretch
+
+
+def resume_search(path, weights, num_bins, capacity, lower_bound):
+    """ Restores the search saved in path """
+    global memo, resume_frames, nodes, fcalls
+    data = checkpoint.load(path)
+    if data['instance'] != (weights, num_bins, capacity, lower_bound):
+        raise NameError('The checkpoint is not the one of this instance')
+    memo = ttable.load(data['memo'])
+    bpsolver.mem = data['mem']
+    bpsolver.largest_mem = data['largest']
+    bpsolver.largest_weights = weights
+    bpsolver.probes = data['probes']
+    bpsolver.calls = data['calls']
+    nodes = data['nodes']
+    fcalls = data['fcalls']
+    resume_frames = data['frames']
+    print "Resuming from %s (%d nodes, depth %d)" % (path, nodes,
+            len(resume_frames))
+
+
+####### Parallel search #######
+
+worker_nodes = {}
+# In a worker: the root lower bound shared by the pool, and its value
+# read every 1024 nodes, which narrows the windows of the search (see
+# solve). 0 in a sequential search
+worker_lb = None
+shared_bound = 0
+def parallel_branch(pool, shared_lb, weights, state, rem_cap, lower_bound,
+        upper_bound, split_depth, backtrack):
+    """
+    Same result as branch(), computed by a pool of worker processes.
+
+    The first split_depth adversary levels are expanded here (see split);
+    each resulting state is solved by a worker within the root window.
+    Whenever all the subproblems below a root move are solved, the root
+    lower bound is raised and shared with the workers through shared_lb.
+    Running subproblems read it too: a subproblem returning at most the
+    bound it ended with only gives an upper bound (see gather).
+    """
+    tasks = []
+    tree = split(weights, state, rem_cap, split_depth, tasks,
+            lower_bound, upper_bound)
+    results = [None]*len(tasks)
+
+    global nodes, worker_nodes
+    for i, val, bt, bound, pid, n, st, c in pool.imap_unordered(solve_task,
+            enumerate(tasks)):
+        results[i] = (val, bt, bound)
+        nodes += n
+        add_counters(c)
+        if st:
+            stats.merge(st)
+            stats.report()
+        worker_nodes[pid] = worker_nodes.get(pid, 0) + n
+        lb = partial_lower_bound(tree, results, lower_bound)
+        if lb > shared_lb.value:
+            shared_lb.value = lb
+
+    val, bt = gather(tree, results, lower_bound)
+    backtrack.attr.update(bt.attr)
+    backtrack.extend(bt)
+    return val
+
+
+def split(weights, state, rem_cap, depth, tasks, lower_bound, upper_bound):
+    """
+    Expands the first depth adversary levels like branch() does.
+    Returns ('max', max_bin, [(w, [(loads, son), ...]), ...]) for an
+    adversary node, or ('task', i) once depth is reached, with tasks[i]
+    describing the state to solve.
+    """
+    if depth == 0:
+        tasks.append((state.contents(), rem_cap, lower_bound, upper_bound,
+                weights))
+        return ('task', len(tasks)-1)
+
+    loads = state.loads
+    moves = []
+    wmax = largest_feasible_weight(state, weights)
+    for w in weights:
+        if w > wmax: continue
+        prev = -1
+        sons = []
+        for i in xrange(len(loads)):
+            if loads[i] == prev:
+                continue
+            prev = loads[i]
+            j = state.apply(w, i)
+            sons.append((tuple(loads), split(weights, state, rem_cap-w,
+                depth-1, tasks, lower_bound, upper_bound)))
+            state.undo(w, j)
+        moves.append((w, sons))
+    return ('max', loads[0], moves)
+
+
+def gather(node, results, lower_bound):
+    """ Minimax over the levels expanded by split().
+    Returns the value of node and its decision tree """
+    if node[0] == 'task':
+        val, bt, bound = results[node[1]]
+        if val <= bound and bound > lower_bound:
+            # The value is at most bound, which a solved move reaches:
+            # this move is never the best one
+            return bound - 0.5, bt
+        return val, bt
+
+    best_stretch = max(node[1], lower_bound)
+    best = TreeNode()
+    for w, sons in node[2]:
+        stretch = None
+        bts = []
+        for loads, son in sons:
+            val, bt = gather(son, results, lower_bound)
+            bt.attr['bins'] = loads
+            bts.append(bt)
+            if stretch is None or val < stretch: stretch = val
+        if stretch > best_stretch:
+            best_stretch = stretch
+            best = TreeNode(bts)
+            best.attr['Next weight'] = w
+    return best_stretch, best
+
+
+def partial_lower_bound(tree, results, lower_bound):
+    """ Best root value among moves whose subproblems are all solved """
+    def value(node):
+        if node[0] == 'task':
+            r = results[node[1]]
+            return r and r[0]
+        best = max(node[1], lower_bound)
+        for w, sons in node[2]:
+            vals = [value(son) for loads, son in sons]
+            if None in vals: continue
+            best = max(best, min(vals))
+        return best
+    return value(tree)
+
+
+def init_worker(shared_lb, trace, jobs):
+    global worker_lb, worker_memo, worker_trace, dominance, ordering
+    global algorithms
+    worker_lb = shared_lb
+    worker_trace = trace
+    # Progress is reported by the main process only
+    stats.interval = None
+    worker_memo = make_memo(jobs)
+    dominance = make_dominance()
+    ordering = make_ordering(move_ordering)
+    algorithms = make_algorithms()
+    init_solver(SOLVER, jarpath, spawn=False, daemon_file=daemon_file)
+    if SOLVER == "CHOCO" or SOLVER == "CP":
+        run_jvm(jvmpath, jarpath)
+    if fcache_path:
+        open_cache(fcache_path)
+    if prefetch_threads:
+        start_prefetch(SOLVER, prefetch_threads, prefetch_queue)
+
+
+def counters():
+    """ Feasibility figures of this process, printed by main() """
+    c = {'fcalls': fcalls, 'ttime': ttime, 'calls': bpsolver.calls,
+            'probes': bpsolver.probes,
+            'bound rejects': dict(bpsolver.bound_rejects),
+            'packer wins': dict(bpsolver.packer_wins)}
+    if bpsolver.pcache:
+        c['cache hits'] = bpsolver.pcache.hits
+        c['cache misses'] = bpsolver.pcache.misses
+    return c
+
+
+def counters_since(c0):
+    """ Increase of the counters() since c0 """
+    c = counters()
+    for k, v in c.iteritems():
+        if isinstance(v, dict):
+            for name in v:
+                v[name] -= c0[k].get(name, 0)
+        else:
+            c[k] = v - c0.get(k, 0)
+    return c
+
+
+def add_counters(c):
+    """ Adds the counters of a worker to the ones of this process """
+    global fcalls, ttime
+    fcalls += c['fcalls']
+    ttime += c['ttime']
+    bpsolver.calls += c['calls']
+    bpsolver.probes += c['probes']
+    for k, d in (('bound rejects', bpsolver.bound_rejects),
+            ('packer wins', bpsolver.packer_wins)):
+        for name, v in c[k].iteritems():
+            d[name] = d.get(name, 0) + v
+    if bpsolver.pcache and 'cache hits' in c:
+        bpsolver.pcache.hits += c['cache hits']
+        bpsolver.pcache.misses += c['cache misses']
+
+
+def solve_task(task):
+    i, (contents, rem_cap, lower_bound, upper_bound, weights) = task
+    state = restore(contents)
+    global shared_bound
+    shared_bound = worker_lb.value
+    lower_bound = max(lower_bound, shared_bound)
+
+    n = nodes
+    c0 = counters()
+    bt = TreeNode() if worker_trace else NullNode()
+    val = solve(worker_memo, state, lower_bound, upper_bound, rem_cap,
+            weights, bt)
+    # Workers are not terminated: results are written after each task
+    if bpsolver.pcache:
+        bpsolver.pcache.flush()
+    st = stats.take() if stats.enabled else None
+    return i, val, bt, max(lower_bound, shared_bound), os.getpid(), \
+            nodes - n, st, counters_since(c0)
+
+
+####### End Parallel search #######
+
 ttime = 0
 fcalls = 0
-def is_feasible_instance(bins, item):
+def is_feasible_instance(state, w):
     """
     Return true iff there is a feasible solution
-    for the bin packing problem with len(bins) bins,
-    their items, plus the additionnal given item.
-
-    Bins capacity are assumed to be all the same.
+    for the bin packing problem with the bins of the state,
+    their items, plus an additionnal item of weight w.
     """
-    if item.size == 0:
+    if w == 0:
         raise NameError('Adding a null sized item!')
-    if not bins:
+    num_bins = len(state.loads)
+    if not num_bins:
         return False
 
-    items = [i for b in bins for i in b.items]
-    items.append(item)
+    global fcalls
+    fcalls += 1
+    key = instance_key(state.items_hash + ITEM_HASH[w],
+            state.items_check + ITEM_CHECK[w], num_bins, state.capacity)
+    r = recall_feasibility(key)
+    if r is not None:
+        return r
+
+    items = state.items()
+    items.append(state.pool[w])
+
+    global ttime
+    t = time.time()
+    r = is_feasible(items, num_bins, state.capacity, SOLVER, key)
+    ttime += time.time() - t
+    return r
+
+
+def largest_feasible_weight(state, weights):
+    """
+    Return the largest w in weights (sorted by decreasing order) such that
+    there is a feasible solution for the bin packing problem with the
+    bins of the state, their items, plus an item of weight w.
+    Return 0 if there is none.
+    """
+    num_bins = len(state.loads)
+    if not num_bins:
+        return 0
 
     global fcalls
     fcalls += 1
+    key = instance_key(state.items_hash, state.items_check, num_bins,
+            state.capacity)
+    r = recall_largest(key, weights)
+    if r is not None:
+        return r
+
     global ttime
     t = time.time()
-    r = is_feasible(items, len(bins), bins[0].capacity, SOLVER)
+    r = largest_feasible(state.items(), weights, num_bins, state.capacity,
+            SOLVER, key)
     ttime += time.time() - t
     return r
 
 
-####### Memoization #######
-def make_key(bins):
-    l = []
-    d = {}
-    for b in bins:
-        l.append(b.remaining)
-        for i in b.items:
-            s = i.size
-            if s not in d: d[s] = 1
-            else: d[s] += 1
-    l.sort() # break symmetries
-    # MEMORY: spare some memory by removing the following line:
-    l.append(-1)
-    # separate bins from items / use less memory than making a list of tuples...
-    # not required here since the number of bins is fixed
-    for i, j in d.iteritems():
-        l.append(i)
-        l.append(j)
-
-    return binascii.rlecode_hqx(' '.join(str(i) for i in l))
-    #return tuple(l)
-
-
-def recall(memo, t, lower_bound, upper_bound):
-    if not t in memo:
-        return False
-    lb, ub, val = memo[t]
-    if val >= ub and ub < upper_bound:
-        return False
-    if val <= lb and lb > lower_bound:
-        return False
-    return val
+def prefetch_son(state, w, weights, batch):
+    """
+    Submits in batch the feasibility queries of the sons of state
+    playing w, to be solved while the previous sons are explored (see
+    bpsolver.prefetch_largest)
+    """
+    collect_prefetched()
+    num_bins = len(state.loads)
+    key = instance_key((state.items_hash + ITEM_HASH[w]) & HASH_MASK,
+            (state.items_check + ITEM_CHECK[w]) & CHECK_MASK, num_bins,
+            state.capacity)
+    prefetch_largest(state.items() + [state.pool[w]], weights, num_bins,
+            state.capacity, SOLVER, key, batch)
 
 
-def store(memo, t, lower_bound, upper_bound, ret):
-    if not t in memo:
-        memo[t] = (lower_bound,upper_bound,ret)
-        return
-    # We know that lb < ub and:
-    # (val >= ub and ub < upper_bound) || (val <= lb and lb > lower_bound)
-    lb, ub, val = memo[t]
-    if val >= ub and ub < upper_bound:
-        memo[t] = (min(lower_bound,lb), upper_bound, max(ret,val))
-    elif val <= lb and lb > lower_bound:
-        memo[t] = (lower_bound, max(upper_bound,ub), min(ret,val))
-    else:
-        raise NameError("Memo issue: both tests shall not fail")
+####### Memoization #######
+def make_key(state):
+    """ Hash and check words of the state """
+    return state.hash, state.check
 
 
-def solve(memo, bins, lower_bound, upper_bound, rem_cap, weights, backtrack):
-    t = make_key(bins)
-    ret = recall(memo, t, lower_bound, upper_bound)
-    if ret:
-        backtrack.attr['cut'] = "Memoized value"
-        #backtrack.attr['val'] = ret
-        return ret
-    ret = branch(weights, bins, rem_cap, lower_bound, upper_bound,
+def solve(memo, state, lower_bound, upper_bound, rem_cap, weights, backtrack):
+    """
+    branch() on state, within ]lower_bound, upper_bound[, using and
+    updating the bounds stored in the transposition table memo
+    """
+    if shared_bound > lower_bound:
+        lower_bound = shared_bound
+    t, check = make_key(state)
+    e = memo.lookup(t, check)
+    if stats.enabled: stats.count('memo: hit' if e else 'memo: miss')
+    if e:
+        lower, upper = e
+        if lower == upper or lower >= upper_bound:
+            backtrack.attr['cut'] = "Memoized value"
+            if stats.enabled: stats.count('cut: Memoized value')
+            #backtrack.attr['val'] = lower
+            return lower
+        if upper <= lower_bound:
+            backtrack.attr['cut'] = "Memoized value"
+            if stats.enabled: stats.count('cut: Memoized value')
+            return upper
+        # The value lies within the stored bounds: narrow the window
+        lower_bound = max(lower_bound, lower)
+        upper_bound = min(upper_bound, upper)
+    if dominance is not None:
+        e = dominance.lookup(state, lower_bound, upper_bound)
+        if e:
+            lower, upper, work = e
+            if lower >= upper_bound or upper <= lower_bound:
+                dominance.cut(work)
+                backtrack.attr['cut'] = "Dominated state"
+                if stats.enabled: stats.count('cut: Dominated state')
+                return lower if lower >= upper_bound else upper
+            lower_bound, upper_bound = lower, upper
+    n = nodes
+    ret = branch(weights, state, rem_cap, lower_bound, upper_bound,
             memo, backtrack)
-    #store(memo, t, lower_bound, upper_bound, ret)
-
-    memo[t] = (lower_bound,upper_bound,ret)
+    # The sons may have been searched above a newer shared bound: ret is
+    # then only an upper bound up to it
+    if shared_bound > lower_bound:
+        lower_bound = shared_bound
+    memo.store(t, check, lower_bound, upper_bound, ret, nodes - n)
+    if dominance is not None:
+        dominance.store(state, lower_bound, upper_bound, ret, nodes - n)
     return ret
 
 
 ####### End Memoization #######
 
 nodes = 0
-def branch(weights, bins, rem_cap, lower_bound, upper_bound, memo={},
-        backtrack=False):
+def branch(weights, state, rem_cap, lower_bound, upper_bound, memo=None,
+        backtrack=NullNode()):
     """
     Branching: Finds the best feasible upper bound within given limits
     Depth first search exploration
 
     Keyword arguments:
     weights -- the set of allowed weights
-    bins -- the bins
+    state -- the GameState, restored before returning
     rem_cap -- total remaining capacity in bins
     lower_bound -- lower bound on the stretched capacity.
         We are aiming at improving it.
     upper_bound -- upper bound on the stretched capacity.
         It is no use to go beyond the upper bound since the results
         will be neglected by some other branches.
+    memo -- the TranspositionTable
+    backtrack -- TreeNode receiving the decision tree of the best move
+        (a NullNode records nothing)
 
     Return maximal stretching factor
     """
-    global nodes
+    global nodes, shared_bound
     nodes += 1
-    if not bins:
+    if stats.enabled: stats.tick()
+    if next_checkpoint and nodes & 4095 == 0 and \
+            time.time() >= next_checkpoint:
+        raise checkpoint.Checkpoint()
+    if worker_lb is not None and nodes & 1023 == 0:
+        shared_bound = worker_lb.value
+    window = (lower_bound, upper_bound)
+    loads = state.loads
+    if not loads:
         raise NameError('Branching to pack items in... no bins!')
     assert rem_cap >= 0
     if lower_bound >= upper_bound:
         backtrack.attr['cut'] = "LB >= UB"
+        if stats.enabled: stats.count('cut: LB >= UB')
         return lower_bound
 
-    # Smallest and largest used capacities
-    u = bins[0].used()
-    min_bin = u
-    max_bin = u
-    for b in bins:
-        u = b.used()
-        max_bin = max(u, max_bin)
-        min_bin = min(u, min_bin)
+    # Smallest and largest used capacities (loads are sorted)
+    max_bin = loads[0]
+    min_bin = loads[-1]
     lower_bound = max(max_bin, lower_bound)
 
     if max_bin >= upper_bound:
         # fathom branch:  we have stretched enough already
         backtrack.attr['cut'] = "Wmax >= UB"
+        if stats.enabled: stats.count('cut: Wmax >= UB')
         return max_bin
 
     """
@@ -265,56 +703,105 @@ def branch(weights, bins, rem_cap, lower_bound, upper_bound, memo={},
     if min_bin + rem_cap <= lower_bound:
         # useless branch
         backtrack.attr['cut'] = "Cannot improve"
+        if stats.enabled: stats.count('cut: Cannot improve')
         return lower_bound
 
-    bb = sorted(bins, key=lambda x: x.remaining, reverse=False)
     best_stretch = max(max_bin,lower_bound)
     best_sons = []
-    feasibilityVerified = False
-    for w in weights:
-        if w > rem_cap: continue
-        it = Item(w)
-        #if not is_feasible_instance(bb, it): continue
-        if not feasibilityVerified:
-            if not is_feasible_instance(bb, it): continue
-            feasibilityVerified = True
-        if min_bin + w >= upper_bound:
-            backtrack.attr['cut'] = "Wmin + "+str(w)+" >= UB"
-            return min_bin + w
-        prev_rem = -1
+    # Every weight up to wmax is feasible
+    needs = exact_needs()
+    wmax = largest_feasible_weight(state, weights)
+    cands = [w for w in weights if w <= wmax]
+    if cands and min_bin + cands[0] >= upper_bound:
+        w = cands[0]
+        backtrack.attr['cut'] = "Wmin + "+str(w)+" >= UB"
+        if stats.enabled: stats.count('cut: Wmin + w >= UB')
+        return min_bin + w
+    if algorithms is not None:
+        # Some online algorithm keeps the loads at most bound
+        bound = algorithms.bound(loads, rem_cap, weights,
+                cands[0] if cands else 0, lower_bound)
+        if bound <= lower_bound:
+            algorithms.cuts += 1
+            backtrack.attr['cut'] = "Algorithm bound"
+            if stats.enabled: stats.count('cut: Algorithm bound')
+            return lower_bound
+        if bound < upper_bound:
+            # The value is at most bound: reaching it is enough
+            algorithms.narrowed += 1
+            upper_bound = bound
+    start = None
+    if resume_frames:
+        start = resume_position(state, window)
+    if start:
+        # Same orders as before the checkpoint
+        order, start_w, start_bins, start_k, start_stretch, best_stretch = \
+            start
+    else:
+        order = ordering.weights(state, cands)
+    # A single bin for any given couple (item weight, bin weight)
+    positions = [i for i in xrange(len(loads)) if i == 0 or
+            loads[i] != loads[i-1]]
+    # Queries of the next weight, when the exact solver was needed here
+    # (the sons have similar items), cancelled when the state is left
+    batch = None
+    if bpsolver.prefetcher is not None and exact_needs() > needs:
+        batch = Batch()
+    for n, w in enumerate(order):
+        if start and w != start_w: continue
+        if batch and n+1 < len(order):
+            prefetch_son(state, order[n+1], weights, batch)
         stretch = upper_bound
         sons = []
-        for b in bb:
-            if b.remaining == prev_rem:
-                # try a single bin for any given couple (item weight, bin weight)
-                continue
-            prev_rem = b.remaining
-            b.force_add(it)
-
-            bt = TreeNode()
-            bt.attr['bins'] = [u.used()
-                    for u in sorted(bins, key=lambda x: id(x))]
+        first = 0
+        if start:
+            # Sons before start_k are done
+            bins = start_bins
+            stretch = start_stretch
+            first = start_k
+            start = None
+        else:
+            bins = ordering.bins(state, w, positions)
+        for k in xrange(first, len(bins)):
+            i = bins[k]
+            load = loads[i]
+            j = state.apply(w, i)
+
+            bt = backtrack.child(bins=tuple(loads))
             sons.append(bt)
 
             # upper_bound is updated to current min stretching factor for this item
             # lower bound is updated to the best stretching factor on all items.
-            val = solve(memo, bb, best_stretch, stretch, rem_cap-w,
-                    weights, bt)
-
-            b.rem_last()
+            try:
+                val = solve(memo, state, best_stretch, stretch, rem_cap-w,
+                        weights, bt)
+            except checkpoint.Checkpoint as e:
+                if batch: batch.cancel()
+                state.undo(w, j)
+                e.frames.append((make_key(state), window, order, w, bins, k,
+                    stretch, best_stretch))
+                raise
+
+            state.undo(w, j)
             stretch = min(val, stretch)
-            if stretch <= best_stretch: break
+            if stretch <= best_stretch:
+                ordering.refutation(state, w, load)
+                break
         if stretch >= upper_bound:
             # item w gives a good enough solution
+            if batch: batch.cancel()
+            ordering.cutoff(state, w)
             backtrack.attr['Next weight'] = w
             #backtrack.attr['val'] = stretch
             backtrack.extend(sons)
             return stretch
         if stretch > best_stretch:
+            ordering.best(state, w)
             backtrack.attr['Next weight'] = w
             best_stretch = stretch
             best_sons = sons
 
+    if batch: batch.cancel()
     #backtrack.attr['val'] = best_stretch
     backtrack.extend(best_sons)
     return best_stretch
@@ -331,6 +818,32 @@ def make_parser():
             help = 'number of bins')
     parser.add_argument('-r', nargs=1, type=int,
             help='Generates R random numbers in 1..C')
+    parser.add_argument('--jobs', type=int, default=1,
+            help='number of worker processes (default: 1)')
+    parser.add_argument('--sequential-nodes', type=int, metavar='NODES',
+            help='#nodes of a sequential run of the same instance, to\
+                report the search overhead and speedup of --jobs')
+    parser.add_argument('--split-depth', type=int, default=2,
+            help='adversary levels split into subproblems with --jobs\
+                (default: 2)')
+    parser.add_argument('--no-trace', action='store_true',
+            help='do not record the decision tree (no backtrack.dot)')
+    parser.add_argument('--stats', action='store_true',
+            help='count cuts, cache hits and solver latencies, and print\
+                them as JSON at the end')
+    parser.add_argument('--progress', type=float, metavar='SECONDS',
+            help='print the figures of --stats as a JSON line every\
+                SECONDS on stderr (implies --stats)')
+    parser.add_argument('--checkpoint', metavar='FILE',
+            help='save the search to FILE periodically (no backtrack.dot)')
+    parser.add_argument('--checkpoint-interval', type=float, default=600,
+            metavar='SECONDS', help='time between two checkpoints\
+                (default: 600)')
+    parser.add_argument('--resume', action='store_true',
+            help='restart the search saved in the --checkpoint file')
+    parser.add_argument('--certificate', metavar='FILE',
+            help='write the strategy of the adversary to FILE, to be\
+                checked by verify.py')
     return parser
 
 def config():
@@ -342,7 +855,10 @@ def config():
     stream.close()
 
     # Set config
-    global SOLVER, jvmpath, jarpath, cache_size
+    global SOLVER, jvmpath, jarpath, tt_size, fcache_path, daemons
+    global daemon_file, dominance_states, move_ordering
+    global algorithm_lookahead, algorithm_budget
+    global prefetch_threads, prefetch_queue
     if 'solver' in conf:
         SOLVER = conf['solver']
     else: SOLVER = 'CHOCO'
@@ -351,9 +867,23 @@ def config():
     if 'jarpath' in conf:
         jarpath = os.path.abspath(dirn) + '/' + conf['jarpath']
     else: jarpath = os.path.abspath(dirn) + '/../lib/'
-    if 'cache-size' in conf:
-        cache_size = conf['cache-size']
-    else: cache_size = 0
+    if 'tt-size' in conf:
+        tt_size = conf['tt-size']
+    else: tt_size = 64
+    if conf.get('feasibility-cache'):
+        fcache_path = os.path.join(os.path.abspath(dirn),
+                conf['feasibility-cache'])
+    else: fcache_path = None
+    daemons = conf.get('daemons', 1)
+    dominance_states = conf.get('dominance-states', 2**18)
+    move_ordering = conf.get('move-ordering', 'history')
+    algorithm_lookahead = conf.get('algorithm-lookahead', 1)
+    algorithm_budget = conf.get('algorithm-budget', 256)
+    prefetch_threads = conf.get('prefetch-threads', 0)
+    prefetch_queue = conf.get('prefetch-queue', 64)
+    bpsolver.set_models(conf.get('model', 'assignment'))
+    daemon_file = os.path.join(os.path.abspath(dirn),
+            conf.get('daemon-file', 'daemons.json'))
 
 def main():
     # Parse options
@@ -362,9 +892,15 @@ def main():
     size = args.capacity[0]
     nbins = args.nbins[0]
     r = args.r
+    if args.resume and not args.checkpoint:
+        p.error("--resume requires --checkpoint")
+    if args.checkpoint and args.jobs > 1:
+        p.error("--checkpoint requires a sequential search (no --jobs)")
 
     # Parse config file and set options
     config()
+    global checkpoint_interval
+    checkpoint_interval = args.checkpoint_interval
 
     print "Solver used = "+SOLVER
     print "==========="
@@ -379,9 +915,14 @@ def main():
     print "Weights = %s" % (weights)
 
     lb = 4*size / 3
+    if args.stats or args.progress:
+        stats.start(args.progress, sys.stderr, search_figures)
     t0 = time.time()
     res = run(weights, num_bins=nbins, capacity=size,\
-            lower_bound=lb)   # We want to improve 4/3 lower bound
+            lower_bound=lb,   # We want to improve 4/3 lower bound
+            jobs=args.jobs, split_depth=args.split_depth,
+            trace=not args.no_trace, certificate=args.certificate,
+            checkpoint_file=args.checkpoint, resume=args.resume)
     t0 = time.time() - t0
 
     if res == lb:
@@ -390,9 +931,61 @@ def main():
         print "\nStretching factor improved:\t\t%s/%s\t= %s" % (res,size,float(res)/size)
 
     print "Feasibility checks:\t\t\t\t  %s" % fcalls
+    print "Feasibility probes (binary search):\t\t  %s" % bpsolver.probes
     print "Time spent verifying feasibility:\t\t  %s" % ttime
+    if bpsolver.bound_rejects:
+        print "Infeasible instances rejected by bounds:\t  %s" % \
+            ", ".join("%s %d" % (name, bpsolver.bound_rejects.get(name, 0))
+                for name, bound in BOUNDS)
+    if bpsolver.packer_wins:
+        print "Feasible instances packed by heuristics:\t  %s" % \
+            ", ".join("%s %d" % (name, bpsolver.packer_wins[name])
+                for name in ['BFD'] + [n for n, p in PACKERS]
+                if name in bpsolver.packer_wins)
     print "#nodes:\t\t\t\t\t\t  %s" % nodes
+    if worker_nodes:
+        # Workers do not share their tables nor their bounds at once, so
+        # they explore more nodes than a sequential run: only the
+        # sequential count measures the gain
+        busiest = max(worker_nodes.values())
+        print "#nodes per worker:\t\t\t\t  %s" % \
+            sorted(worker_nodes.values(), reverse=True)
+        print "Load balance (#nodes / busiest worker):\t  %.2f" % \
+            (float(nodes)/max(busiest, 1))
+        if args.sequential_nodes:
+            seq = args.sequential_nodes
+            print "Search overhead (#nodes / sequential):\t  %.2f" % \
+                (float(nodes)/seq)
+            print "Node speedup (sequential / busiest worker):\t  %.2f" \
+                % (float(seq)/max(busiest, 1))
+    if memo:
+        st = memo.stats()
+        print "Transposition table hits/misses:\t\t  %s/%s (%.1f%%)" % \
+            (st['hits'], st['misses'], 100*st['hit rate'])
+    if dominance:
+        st = dominance.stats()
+        print "Dominated states cuts/lookups:\t\t\t  %s/%s (~%s nodes saved)" % \
+            (st['cuts'], st['lookups'], st['nodes saved (est.)'])
+    if algorithms:
+        st = algorithms.stats()
+        print "Algorithm bound cuts/narrowed/bounds:\t\t  %s/%s/%s" % \
+            (st['cuts'], st['narrowed windows'], st['bounds'])
+    if bpsolver.prefetcher:
+        st = bpsolver.prefetcher.stats()
+        print "Prefetched queries taken/solved/submitted:\t  %s/%s/%s" % \
+            (st['taken'], st['solved'], st['submitted'])
+    for f in bpsolver.frontiers.values():
+        st = f.stats()
+        print "Subset/superset hits/misses:\t\t\t  %s/%s (%s infeasible"\
+            " and %s feasible multisets)" % (st['hits'], st['misses'],
+                st['infeasible'], st['feasible'])
+    if bpsolver.pcache:
+        st = bpsolver.pcache.stats()
+        print "Feasibility cache hits/misses:\t\t\t  %s/%s (%.1f%%)" % \
+            (st['hits'], st['misses'], 100*st['hit rate'])
     print "Total elapsed time:\t\t\t\t  %s" % t0
+    if stats.enabled:
+        print json.dumps(stats.summary(), indent=1, sort_keys=True)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,150 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+
+"""
+Feasibility tests of a bin packing instance plus one item, evaluated for
+every candidate weight of the item at once with NumPy.
+
+largest_feasible needs, for the items of a node, the largest weight w
+such that the items plus an item of size w fit in the bins. Instead of
+testing each w in turn, classify() computes for all candidates in one
+pass the necessary conditions of is_trivial and heuristics (total size,
+big and half items, the two items around the num_bins-th largest), the
+L2 bound and a first fit decreasing packing. The weights left undecided
+go to the exact solver.
+
+NumPy is optional: without it, `available` is False and bpsolver keeps
+its scalar tests.
+"""
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+available = np is not None
+
+
+def classify(sizes, weights, num_bins, capacity):
+    """
+    Splits weights into the lists (feasible, infeasible, undecided), in
+    the order of weights, according to whether the items of given sizes
+    plus an item of weight w can be packed into num_bins bins.
+    sizes are sorted by decreasing order.
+    """
+    ws = np.asarray(weights, dtype=np.int64)
+    n = len(sizes)
+    if n < num_bins:
+        return list(weights), [], []
+    a = np.asarray(sizes, dtype=np.int64)
+    total = int(a.sum())
+
+    # Sorted items plus w: w comes at position p, after the items >= w
+    p = n - np.searchsorted(a[::-1], ws, side='left')
+    def merged(j):
+        """ Size of the j-th largest item, for each candidate """
+        before = a[j] if j < n else 0
+        after = a[j-1] if j > 0 else 0
+        return np.where(p > j, before, np.where(p == j, ws, after))
+
+    # Necessary conditions: total size, big and half items, and the
+    # num_bins+1 largest items which cannot share a bin
+    infeasible = total + ws > num_bins*capacity
+    big = int(np.count_nonzero(2*a > capacity)) + (2*ws > capacity)
+    half = int(np.count_nonzero(2*a == capacity)) + (2*ws == capacity)
+    infeasible |= 2*big + half > 2*num_bins
+    infeasible |= merged(num_bins-1) + merged(num_bins) > capacity
+
+    # L2 bound (see heuristic.l2_bound), for the parameters k given by
+    # the items
+    for k in set(int(s) for s in a if 2*s <= capacity) | set([0]):
+        j1 = a > capacity - k
+        j2 = ~j1 & (2*a > capacity)
+        j3 = ~j1 & ~j2 & (a >= k)
+        w1 = ws > capacity - k
+        w2 = ~w1 & (2*ws > capacity)
+        w3 = ~w1 & ~w2 & (ws >= k)
+        n2 = int(np.count_nonzero(j2)) + w2
+        free = n2*capacity - int(a[j2].sum()) - ws*w2
+        s3 = int(a[j3].sum()) + ws*w3
+        bound = int(np.count_nonzero(j1)) + w1 + n2 + \
+            np.maximum(0, -((free - s3) // capacity))
+        infeasible |= bound > num_bins
+
+    # First fit decreasing, one row of bins per candidate, and the items
+    # alone in the last row: w fits in the free space of their packing
+    m = len(ws)
+    rows = np.arange(m+1)
+    loads = np.zeros((m+1, num_bins), dtype=np.int64)
+    packed = np.ones(m+1, dtype=bool)
+    for j in xrange(n+1):
+        s = np.append(merged(j), a[j] if j < n else 0)
+        fits = loads + s[:, None] <= capacity
+        packed &= fits.any(axis=1)
+        loads[rows, fits.argmax(axis=1)] += s
+    feasible = packed[:m] & ~infeasible
+    if packed[m]:
+        feasible |= ws <= capacity - loads[m].min()
+
+    f, i, u = [], [], []
+    for w, ok, ko in zip(weights, feasible, infeasible):
+        if ok: f.append(w)
+        elif ko: i.append(w)
+        else: u.append(w)
+    return f, i, u
+
+
+def main():
+    if not available:
+        print "NumPy is not available"
+        return
+    # Items 6, 5, 3 in 2 bins of 10: 6+3 / 5 leaves 5
+    f, i, u = classify([6, 5, 3], range(10, 0, -1), 2, 10)
+    assert (f, i, u) == ([5, 4, 3, 2, 1], [10, 9, 8, 7, 6], [])
+    # 4+3+3 / 4+3+3 fits, but first fit decreasing puts 4+4 together
+    f, i, u = classify([4, 4, 3, 3, 3], [3], 2, 10)
+    assert (f, i, u) == ([], [], [3])
+    # Items 7, 7: a third item larger than 3 cannot be packed
+    f, i, u = classify([7, 7], [6, 4, 3], 2, 10)
+    assert (f, i, u) == ([3], [6, 4], [])
+    # Only L2 sees that 7, 7, 4, 4, 4 need 4 bins
+    f, i, u = classify([7, 7, 4, 4], [4, 2], 3, 10)
+    assert (f, i, u) == ([2], [4], [])
+    print "Dummy tests passed"
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+# -*- coding: UTF-8 -*-
+##########################################################################
+# Copyright or © or Copr. Michaël Gabay (2013)
+#
+# michael [dot] gabay [at] g-scop.grenoble-inp.fr
+#
+# This software is a computer program whose purpose is to be
+# a proof of concept on using game theoretical approaches to prove
+# lower bounds on online packing and scheduling problems.
+#
+# This software is governed by the CeCILL license under French law and
+# abiding by the rules of distribution of free software.  You can  use,
+# modify and/ or redistribute the software under the terms of the CeCILL
+# license as circulated by CEA, CNRS and INRIA at the following URL
+# "http://www.cecill.info".
+#
+# As a counterpart to the access to the source code and  rights to copy,
+# modify and redistribute granted by the license, users are provided only
+# with a limited warranty  and the software's author,  the holder of the
+# economic rights,  and the successive licensors  have only  limited
+# liability.
+#
+# In this respect, the user's attention is drawn to the risks associated
+# with loading,  using,  modifying and/or developing or reproducing the
+# software by the user in light of its specific status of free software,
+# that may mean  that it is complicated to manipulate,  and  that  also
+# therefore means  that it is reserved for developers  and  experienced
+# professionals having in-depth computer knowledge. Users are therefore
+# encouraged to load and test the software's suitability as regards their
+# requirements in conditions enabling the security of their systems and/or
+# data to be ensured and,  more generally, to use and operate it in the
+# same conditions as regards security.
+#
+# The fact that you are presently reading this means that you have had
+# knowledge of the CeCILL license and that you accept its terms.
+##########################################################################
+"""
+Independent verifier of the certificates written by upper_bounding.py
+(see certificate.py).
+
+The strategy tree is replayed from empty bins, with its own bookkeeping
+of the bin loads and of the items. The verifier checks that:
+- every leaf S has a bin load of at least target;
+- every W node has one subtree per distinct bin load, and plays an
+  allowed weight;
+- every reference R points to an earlier W node of the same state;
+- the items played up to any W node, plus its item, can be packed into
+  the bins. These bin packing problems are solved with the solver of
+  config.conf, by a pool of worker processes.
+
+    python verify.py certificate.txt [--jobs J]
+"""
+
+import os
+import sys
+import time
+import argparse
+import multiprocessing
+
+import yaml
+
+import bpsolver
+from bins import Item
+from certificate import read_header
+
+
+def replay(f, num_bins, capacity, target, weights):
+    """
+    Checks the structure of the strategy read from f.
+    Returns the item multisets whose feasibility remains to be checked,
+    and the number of nodes.
+    """
+    allowed = set(weights)
+    loads = [0]*num_bins
+    items = []
+    defs = []
+    queries = set()
+    # Frames of the W nodes being read: [w, distinct loads, child index]
+    stack = []
+    nodes = 0
+    done = False
+
+    def place(frame):
+        w, choices, k = frame
+        loads[loads.index(choices[k])] += w
+        items.append(w)
+
+    def unplace(frame):
+        w, choices, k = frame
+        loads[loads.index(choices[k] + w)] -= w
+        items.pop()
+
+    def signature():
+        return tuple(sorted(loads)), tuple(sorted(items))
+
+    for n, line in enumerate(f):
+        line = line.split()
+        if not line: continue
+        if done:
+            raise ValueError("line %d: after the end of the tree" % (n+6))
+        nodes += 1
+        kind = line[0]
+        if kind == 'S':
+            if max(loads) < target:
+                raise ValueError("line %d: loads %s do not reach %d"
+                        % (n+6, loads, target))
+        elif kind == 'R':
+            k = int(line[1])
+            if k >= len(defs) or defs[k] != signature():
+                raise ValueError("line %d: reference to another state"
+                        % (n+6))
+        elif kind == 'W':
+            w = int(line[1])
+            if w not in allowed or w <= 0:
+                raise ValueError("line %d: weight %d is not allowed"
+                        % (n+6, w))
+            queries.add(tuple(sorted(items + [w], reverse=True)))
+            defs.append(signature())
+            frame = [w, sorted(set(loads), reverse=True), 0]
+            stack.append(frame)
+            place(frame)
+            continue
+        else:
+            raise ValueError("line %d: unknown node %s" % (n+6, kind))
+
+        # The subtree is complete: go to the next child of a W node
+        while stack:
+            frame = stack[-1]
+            unplace(frame)
+            frame[2] += 1
+            if frame[2] < len(frame[1]):
+                place(frame)
+                break
+            stack.pop()
+        else:
+            done = True
+
+    if not done:
+        raise ValueError("Truncated certificate")
+    return queries, nodes
+
+
+def init_worker(solver, jarpath, jvmpath, daemon_file):
+    global SOLVER
+    SOLVER = solver
+    bpsolver.init_solver(solver, jarpath, spawn=False,
+            daemon_file=daemon_file)
+    if solver == "CHOCO" or solver == "CP":
+        bpsolver.run_jvm(jvmpath, jarpath)
+
+
+def check_feasible(task):
+    sizes, num_bins, capacity = task
+    items = [Item(w) for w in sizes]
+    return sizes, bpsolver.is_feasible(items, num_bins, capacity, SOLVER)
+
+
+def verify(path, jobs=1, solver="NATIVE", jarpath=None, jvmpath=None,
+        daemons=1, daemon_file=None):
+    """
+    Checks the certificate of path. Returns the target it proves, raises
+    ValueError if the certificate is wrong.
+    """
+    f = open(path)
+    num_bins, capacity, target, weights = read_header(f)
+    queries, nodes = replay(f, num_bins, capacity, target, weights)
+    f.close()
+
+    # Workers are forked before a JVM is started in this process
+    pool = multiprocessing.Pool(jobs, init_worker,
+            (solver, jarpath, jvmpath, daemon_file))
+    bpsolver.init_solver(solver, jarpath, daemons=daemons,
+            daemon_file=daemon_file)
+    tasks = [(q, num_bins, capacity) for q in queries]
+    try:
+        for sizes, feasible in pool.imap_unordered(check_feasible, tasks,
+                chunksize=max(1, len(tasks)/(16*jobs))):
+            if not feasible:
+                raise ValueError("Items %s cannot be packed into %d bins"
+                        % (list(sizes), num_bins))
+    finally:
+        pool.terminate()
+        pool.join()
+        bpsolver.terminate_solver(solver)
+    print "%d nodes, %d bin packing problems checked" % (nodes, len(tasks))
+    return target
+
+
+def main():
+    p = argparse.ArgumentParser(description='Checks a certificate written\
+            by upper_bounding.py --certificate')
+    p.add_argument('certificate')
+    p.add_argument('--jobs', type=int, default=multiprocessing.cpu_count(),
+            help='number of worker processes (default: number of CPUs)')
+    p.add_argument('--solver', default=None,
+            help='bin packing solver (default: solver in config.conf)')
+    args = p.parse_args()
+
+    dirn = os.path.abspath(os.path.dirname(sys.argv[0]))
+    stream = file(dirn + '/config.conf')
+    conf = yaml.load(stream)
+    stream.close()
+    solver = args.solver or conf.get('solver', 'CHOCO')
+    jarpath = os.path.join(dirn, conf.get('jarpath', '../lib/'))
+    daemon_file = os.path.join(dirn, conf.get('daemon-file', 'daemons.json'))
+    bpsolver.set_models(conf.get('model', 'assignment'))
+
+    t0 = time.time()
+    try:
+        target = verify(args.certificate, args.jobs, solver, jarpath,
+                conf.get('jvmpath'), conf.get('daemons', 1), daemon_file)
+    except ValueError as e:
+        print "Certificate rejected: %s" % e
+        sys.exit(1)
+    f = open(args.certificate)
+    num_bins, capacity = read_header(f)[:2]
+    f.close()
+    print "Certificate valid: stretching factor >= %d/%d = %f on %d bins" \
+            % (target, capacity, float(target)/capacity, num_bins)
+    print "Verification time: %s" % (time.time() - t0)
+
+if __name__ == "__main__":
+    main()